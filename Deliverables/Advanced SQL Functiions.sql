@@ -21,25 +21,94 @@ END;
 $$ LANGUAGE plpgsql;
 
 -- Table: monthly_admission_summary
+-- los_sum / los_count / deaths are the additive parts used for incremental refresh
 CREATE TABLE IF NOT EXISTS monthly_admission_summary (
     summary_month DATE PRIMARY KEY,
     total_admissions INT,
     avg_los FLOAT,
-    mortality_rate FLOAT
+    mortality_rate FLOAT,
+    los_sum BIGINT,
+    los_count INT,
+    deaths INT
+);
+
+-- Table: department_summary (backs mv_department_summary below)
+CREATE TABLE IF NOT EXISTS department_summary (
+    department VARCHAR(100) PRIMARY KEY,
+    total_admissions INT,
+    avg_los FLOAT,
+    deaths INT,
+    mortality_rate FLOAT,
+    los_sum BIGINT,
+    los_count INT
 );
 
 -- Procedure: sp_generate_monthly_summary
+-- Folds only the load batches not yet applied (see load_batches in DB Design.sql)
+-- into both summary tables with additive upserts. Safe to re-run; row-level
+-- upserts never block readers.
 CREATE OR REPLACE PROCEDURE sp_generate_monthly_summary()
-LANGUAGE SQL
+LANGUAGE plpgsql
 AS $$
-    INSERT INTO monthly_admission_summary (summary_month, total_admissions, avg_los, mortality_rate)
+DECLARE
+    pending INT[];
+BEGIN
+    SELECT ARRAY_AGG(batch_id) INTO pending
+    FROM load_batches
+    WHERE NOT summaries_refreshed;
+
+    IF pending IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO monthly_admission_summary
+        (summary_month, total_admissions, avg_los, mortality_rate, los_sum, los_count, deaths)
     SELECT
-        DATE_TRUNC('month', doa) AS summary_month,
-        COUNT(*) AS total_admissions,
-        ROUND(AVG(length_of_stay), 2) AS avg_los,
-        ROUND(100.0 * SUM(CASE WHEN is_mortality_case THEN 1 ELSE 0 END)/COUNT(*), 2) AS mortality_rate
+        DATE_TRUNC('month', doa)::DATE,
+        COUNT(*),
+        ROUND(AVG(length_of_stay), 2),
+        ROUND(100.0 * SUM(CASE WHEN is_mortality_case THEN 1 ELSE 0 END)/COUNT(*), 2),
+        SUM(length_of_stay),
+        COUNT(length_of_stay),
+        SUM(CASE WHEN is_mortality_case THEN 1 ELSE 0 END)
+    FROM fact_admissions
+    WHERE load_batch_id = ANY(pending)
+    GROUP BY 1
+    ON CONFLICT (summary_month) DO UPDATE SET
+        total_admissions = monthly_admission_summary.total_admissions + EXCLUDED.total_admissions,
+        los_sum = COALESCE(monthly_admission_summary.los_sum, 0) + COALESCE(EXCLUDED.los_sum, 0),
+        los_count = monthly_admission_summary.los_count + EXCLUDED.los_count,
+        deaths = monthly_admission_summary.deaths + EXCLUDED.deaths,
+        avg_los = ROUND((COALESCE(monthly_admission_summary.los_sum, 0) + COALESCE(EXCLUDED.los_sum, 0))::NUMERIC
+                        / NULLIF(monthly_admission_summary.los_count + EXCLUDED.los_count, 0), 2),
+        mortality_rate = ROUND(100.0 * (monthly_admission_summary.deaths + EXCLUDED.deaths)
+                               / (monthly_admission_summary.total_admissions + EXCLUDED.total_admissions), 2);
+
+    INSERT INTO department_summary
+        (department, total_admissions, avg_los, deaths, mortality_rate, los_sum, los_count)
+    SELECT
+        department,
+        COUNT(*),
+        ROUND(AVG(length_of_stay), 2),
+        COUNT(*) FILTER (WHERE is_mortality_case),
+        ROUND(100.0 * COUNT(*) FILTER (WHERE is_mortality_case)/COUNT(*), 2),
+        SUM(length_of_stay),
+        COUNT(length_of_stay)
     FROM fact_admissions
-    GROUP BY summary_month;
+    WHERE load_batch_id = ANY(pending) AND department IS NOT NULL
+    GROUP BY department
+    ON CONFLICT (department) DO UPDATE SET
+        total_admissions = department_summary.total_admissions + EXCLUDED.total_admissions,
+        los_sum = COALESCE(department_summary.los_sum, 0) + COALESCE(EXCLUDED.los_sum, 0),
+        los_count = department_summary.los_count + EXCLUDED.los_count,
+        deaths = department_summary.deaths + EXCLUDED.deaths,
+        avg_los = ROUND((COALESCE(department_summary.los_sum, 0) + COALESCE(EXCLUDED.los_sum, 0))::NUMERIC
+                        / NULLIF(department_summary.los_count + EXCLUDED.los_count, 0), 2),
+        mortality_rate = ROUND(100.0 * (department_summary.deaths + EXCLUDED.deaths)
+                               / (department_summary.total_admissions + EXCLUDED.total_admissions), 2);
+
+    UPDATE load_batches SET summaries_refreshed = TRUE WHERE batch_id = ANY(pending);
+END;
 $$;
 
 -- Trigger Function: trg_check_los_outlier
@@ -61,16 +130,13 @@ BEFORE INSERT ON fact_admissions
 FOR EACH ROW
 EXECUTE FUNCTION trg_check_los_outlier();
 
--- Materialized View: mv_department_summary
-CREATE MATERIALIZED VIEW mv_department_summary AS
-SELECT
-    department,
-    COUNT(*) AS total_admissions,
-    ROUND(AVG(length_of_stay), 2) AS avg_los,
-    COUNT(*) FILTER (WHERE is_mortality_case) AS deaths,
-    ROUND(100.0 * COUNT(*) FILTER (WHERE is_mortality_case)/COUNT(*), 2) AS mortality_rate
-FROM fact_admissions
-GROUP BY department;
+-- View: mv_department_summary
+-- Formerly a materialized view that needed a full REFRESH; it now reads the
+-- incrementally maintained department_summary table (same name and columns).
+DROP MATERIALIZED VIEW IF EXISTS mv_department_summary;
+CREATE OR REPLACE VIEW mv_department_summary AS
+SELECT department, total_admissions, avg_los, deaths, mortality_rate
+FROM department_summary;
 
 -- Function: fn_department_efficiency
 CREATE OR REPLACE FUNCTION fn_department_efficiency(dept TEXT)
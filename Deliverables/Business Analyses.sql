@@ -119,21 +119,16 @@ GROUP BY first_week
 ORDER BY first_week;
 
 -- Query 9: Pollution Impact Simulation (Low vs High Week Segmentation)
-WITH pollution_flags AS (
-    SELECT admission_week,
-           ROUND(AVG(pm25), 2) AS avg_pm25
-    FROM fact_admissions
-    WHERE pm25 IS NOT NULL
-    GROUP BY admission_week
-),
-categorized AS (
+-- Weekly PM2.5 comes pre-aggregated from pollution_weekly_exposure
+WITH categorized AS (
     SELECT f.*, 
            CASE
                WHEN p.avg_pm25 > 100 THEN 'High Pollution'
                ELSE 'Normal Pollution'
            END AS pollution_flag
     FROM fact_admissions f
-    JOIN pollution_flags p ON f.admission_week = p.admission_week
+    JOIN pollution_weekly_exposure p ON p.week_start = DATE_TRUNC('week', f.doa)::DATE
+    WHERE p.avg_pm25 IS NOT NULL
 )
 SELECT pollution_flag,
        COUNT(*) AS total_adm,
@@ -372,14 +367,10 @@ FROM patient_summary
 ORDER BY total_stay DESC;
 
 -- Query 28: Pollution-Adaptive Risk Banding by PM2.5 Levels
+-- pollution_category is banded on PM2.5 (>=150, >=100, >=60) at load time
 WITH pollution_bands AS (
     SELECT *,
-           CASE
-               WHEN pm25 >= 150 THEN 'Hazardous'
-               WHEN pm25 >= 100 THEN 'Severe'
-               WHEN pm25 >= 60 THEN 'High'
-               ELSE 'Normal'
-           END AS pm25_band
+           pollution_category AS pm25_band
     FROM fact_admissions
     WHERE pm25 IS NOT NULL
 )
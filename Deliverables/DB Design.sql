@@ -8,7 +8,11 @@ DROP TABLE IF EXISTS fact_admissions;
 DROP TABLE IF EXISTS dim_patient CASCADE;
 DROP TABLE IF EXISTS dim_department CASCADE;
 DROP TABLE IF EXISTS dim_pollution CASCADE;
+DROP TABLE IF EXISTS stg_pollution_data;
+DROP TABLE IF EXISTS pollution_weekly_exposure;
+DROP TABLE IF EXISTS pollution_monthly_exposure;
 DROP TABLE IF EXISTS stg_master_hospital_data;
+DROP TABLE IF EXISTS load_batches;
 
 -- --------------------------------------------------------------------------
 -- STEP 1: CREATE STAGING TABLE (Including all colums in master table)
@@ -93,6 +97,7 @@ CREATE TABLE dim_department (
 
 CREATE TABLE dim_pollution (
     recorded_date DATE PRIMARY KEY,
+    aqi FLOAT,
     pm25 FLOAT,
     pm10 FLOAT,
     no2 FLOAT,
@@ -122,11 +127,52 @@ CREATE TABLE fact_admissions (
     no2 FLOAT,
     so2 FLOAT,
     pollution_category VARCHAR(20),
+    load_batch_id INT,
 
     CONSTRAINT fk_patient FOREIGN KEY (mrd_no) REFERENCES dim_patient(mrd_no),
     CONSTRAINT fk_department FOREIGN KEY (department) REFERENCES dim_department(department)
 );
 
+CREATE INDEX idx_fact_load_batch ON fact_admissions (load_batch_id);
+CREATE INDEX idx_fact_doa ON fact_admissions (doa);
+CREATE INDEX idx_fact_mrd_no ON fact_admissions (mrd_no, doa);
+CREATE INDEX idx_fact_department ON fact_admissions (department);
+CREATE INDEX idx_fact_pollution_category ON fact_admissions (pollution_category);
+
+-- Pre-aggregated pollution exposure, keyed by period start date
+CREATE TABLE pollution_weekly_exposure (
+    week_start DATE PRIMARY KEY,
+    days INT,
+    avg_aqi FLOAT,
+    avg_pm25 FLOAT,
+    max_pm25 FLOAT,
+    avg_pm10 FLOAT,
+    avg_no2 FLOAT,
+    avg_so2 FLOAT,
+    pollution_category VARCHAR(20)
+);
+
+CREATE TABLE pollution_monthly_exposure (
+    month_start DATE PRIMARY KEY,
+    days INT,
+    avg_aqi FLOAT,
+    avg_pm25 FLOAT,
+    max_pm25 FLOAT,
+    avg_pm10 FLOAT,
+    avg_no2 FLOAT,
+    avg_so2 FLOAT,
+    pollution_category VARCHAR(20)
+);
+
+-- Change log of fact loads; summaries_refreshed marks batches already folded
+-- into the summary tables by sp_generate_monthly_summary()
+CREATE TABLE load_batches (
+    batch_id INT PRIMARY KEY,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    row_count INT,
+    summaries_refreshed BOOLEAN DEFAULT FALSE
+);
+
 -- --------------------------------------------------------
 -- STEP 4: POPULATE DIMENSIONS
 -- --------------------------------------------------------
@@ -148,18 +194,79 @@ FROM stg_master_hospital_data
 WHERE type_of_admissionemergencyopd IS NOT NULL
 ON CONFLICT (department) DO NOTHING;
 
--- Insert into dim_pollution (dummy data for now)
-INSERT INTO dim_pollution (recorded_date, pm25, pm10, no2, so2, pollution_category)
-SELECT DISTINCT 
-    doa::DATE,
-    NULL::FLOAT,
-    NULL::FLOAT,
-    NULL::FLOAT,
-    NULL::FLOAT,
-    'Unknown'::VARCHAR(20)
-FROM stg_master_hospital_data
-WHERE doa IS NOT NULL
-ON CONFLICT (recorded_date) DO NOTHING;
+-- Insert into dim_pollution from HDHI Pollution Data.csv
+-- Load with: \copy stg_pollution_data FROM 'HDHI Pollution Data.csv' CSV HEADER
+CREATE TABLE stg_pollution_data (
+    date TEXT, aqi TEXT,
+    pm25_avg TEXT, pm25_min TEXT, pm25_max TEXT,
+    pm10_avg TEXT, pm10_min TEXT, pm10_max TEXT,
+    no2_avg TEXT, no2_min TEXT, no2_max TEXT,
+    nh3_avg TEXT, nh3_min TEXT, nh3_max TEXT,
+    so2_avg TEXT, so2_min TEXT, so2_max TEXT,
+    co_avg TEXT, co_min TEXT, co_max TEXT,
+    ozone_avg TEXT, ozone_min TEXT, ozone_max TEXT,
+    prominent_pollutent TEXT, max_temp TEXT, min_temp TEXT, humidity TEXT
+);
+
+-- PM2.5 bands match Business Analyses Query 28
+INSERT INTO dim_pollution (recorded_date, aqi, pm25, pm10, no2, so2, pollution_category)
+SELECT DISTINCT ON (TO_DATE(date, 'MM/DD/YYYY'))
+    TO_DATE(date, 'MM/DD/YYYY'),
+    NULLIF(aqi, '')::FLOAT,
+    NULLIF(pm25_avg, '')::FLOAT,
+    NULLIF(pm10_avg, '')::FLOAT,
+    NULLIF(no2_avg, '')::FLOAT,
+    NULLIF(so2_avg, '')::FLOAT,
+    CASE
+        WHEN NULLIF(pm25_avg, '') IS NULL THEN 'Unknown'
+        WHEN pm25_avg::FLOAT >= 150 THEN 'Hazardous'
+        WHEN pm25_avg::FLOAT >= 100 THEN 'Severe'
+        WHEN pm25_avg::FLOAT >= 60 THEN 'High'
+        ELSE 'Normal'
+    END
+FROM stg_pollution_data
+WHERE NULLIF(date, '') IS NOT NULL
+ON CONFLICT (recorded_date) DO UPDATE SET
+    aqi = EXCLUDED.aqi, pm25 = EXCLUDED.pm25, pm10 = EXCLUDED.pm10,
+    no2 = EXCLUDED.no2, so2 = EXCLUDED.so2, pollution_category = EXCLUDED.pollution_category;
+
+INSERT INTO pollution_weekly_exposure
+SELECT DATE_TRUNC('week', recorded_date)::DATE,
+       COUNT(*),
+       ROUND(AVG(aqi)::NUMERIC, 2),
+       ROUND(AVG(pm25)::NUMERIC, 2),
+       MAX(pm25),
+       ROUND(AVG(pm10)::NUMERIC, 2),
+       ROUND(AVG(no2)::NUMERIC, 2),
+       ROUND(AVG(so2)::NUMERIC, 2),
+       CASE
+           WHEN AVG(pm25) IS NULL THEN 'Unknown'
+           WHEN AVG(pm25) >= 150 THEN 'Hazardous'
+           WHEN AVG(pm25) >= 100 THEN 'Severe'
+           WHEN AVG(pm25) >= 60 THEN 'High'
+           ELSE 'Normal'
+       END
+FROM dim_pollution
+GROUP BY 1;
+
+INSERT INTO pollution_monthly_exposure
+SELECT DATE_TRUNC('month', recorded_date)::DATE,
+       COUNT(*),
+       ROUND(AVG(aqi)::NUMERIC, 2),
+       ROUND(AVG(pm25)::NUMERIC, 2),
+       MAX(pm25),
+       ROUND(AVG(pm10)::NUMERIC, 2),
+       ROUND(AVG(no2)::NUMERIC, 2),
+       ROUND(AVG(so2)::NUMERIC, 2),
+       CASE
+           WHEN AVG(pm25) IS NULL THEN 'Unknown'
+           WHEN AVG(pm25) >= 150 THEN 'Hazardous'
+           WHEN AVG(pm25) >= 100 THEN 'Severe'
+           WHEN AVG(pm25) >= 60 THEN 'High'
+           ELSE 'Normal'
+       END
+FROM dim_pollution
+GROUP BY 1;
 
 
 
@@ -167,10 +274,14 @@ ON CONFLICT (recorded_date) DO NOTHING;
 -- STEP 5: POPULATE FACT TABLE
 -- --------------------------------------------------------
 
+INSERT INTO load_batches (batch_id, row_count)
+SELECT COALESCE(MAX(batch_id), 0) + 1, (SELECT COUNT(*) FROM stg_master_hospital_data)
+FROM load_batches;
+
 INSERT INTO fact_admissions (
     mrd_no, doa, dod, age, age_bucket, gender, department, diagnosis,
     length_of_stay, admission_week, is_mortality_case,
-    pm25, pm10, no2, so2, pollution_category
+    pm25, pm10, no2, so2, pollution_category, load_batch_id
 )
 SELECT
     mrd_no::VARCHAR(20),
@@ -184,9 +295,11 @@ SELECT
     duration_of_stay::INT,
     EXTRACT(WEEK FROM doa::DATE)::INT,
     CASE WHEN LOWER(outcome) LIKE '%death%' THEN TRUE ELSE FALSE END,
-    NULL::FLOAT, NULL::FLOAT, NULL::FLOAT, NULL::FLOAT,
-    'Unknown'::VARCHAR(20)
-FROM stg_master_hospital_data
+    p.pm25, p.pm10, p.no2, p.so2,
+    COALESCE(p.pollution_category, 'Unknown')::VARCHAR(20),
+    (SELECT MAX(batch_id) FROM load_batches)
+FROM stg_master_hospital_data s
+LEFT JOIN dim_pollution p ON p.recorded_date = s.doa::DATE
 WHERE mrd_no IS NOT NULL AND doa IS NOT NULL;
 
 
@@ -1,11 +1,27 @@
+import os
+
 import pandas as pd
 import numpy as np
 
+from carepulse.paths import (ADMISSION_DATA, MORTALITY_DATA, POLLUTION_DATA,
+                             TABLE_HEADINGS, MASTER_DATA, QUARANTINE_DATA, VALIDATION_REPORT)
+from carepulse.readmission import add_readmission_features
+from carepulse.validation import ValidationEngine
+
 # Load datasets
-admissions = pd.read_csv("/mnt/data/HDHI Admission data.csv")
-mortality = pd.read_csv("/mnt/data/HDHI Mortality Data.csv")
-pollution = pd.read_csv("/mnt/data/HDHI Pollution Data.csv")
-table_meta = pd.read_csv("/mnt/data/table_headings.csv")
+admissions = pd.read_csv(ADMISSION_DATA)
+mortality = pd.read_csv(MORTALITY_DATA)
+pollution = pd.read_csv(POLLUTION_DATA)
+table_meta = pd.read_csv(TABLE_HEADINGS)
+
+def display(name, dataframe):
+    # ace_tools only exists inside the notebook environment
+    try:
+        import ace_tools as tools
+    except ImportError:
+        print(f"\n{name}\n{dataframe.head(20)}")
+        return
+    tools.display_dataframe_to_user(name=name, dataframe=dataframe)
 
 # --- 1. Clean column names ---
 def clean_column_names(df):
@@ -16,6 +32,17 @@ admissions = clean_column_names(admissions)
 mortality = clean_column_names(mortality)
 pollution = clean_column_names(pollution)
 
+# --- 1b. Validate admissions: impossible rows go to quarantine, the rest continue ---
+references = {'pollution_dates': pollution['date'].astype(str)} if 'date' in pollution.columns else None
+validator = ValidationEngine(references=references)
+admissions, quarantined = validator.validate(admissions)
+os.makedirs(os.path.dirname(QUARANTINE_DATA), exist_ok=True)
+quarantined.to_csv(QUARANTINE_DATA, index=False)
+validation_report = validator.report()
+validation_report.to_csv(VALIDATION_REPORT, index=False)
+display("Validation Report", validation_report[validation_report['violations'] > 0])
+print(f"Validated {validator.rows_checked} admissions, quarantined {validator.rows_quarantined}")
+
 # --- 2. Convert dates ---
 date_cols = ['admission_date', 'discharge_date', 'death_date', 'recorded_date']
 for col in date_cols:
@@ -57,13 +84,18 @@ if 'admission_date' in merged.columns and 'recorded_date' in pollution.columns:
     pollution_daily.columns = ['admission_date' if col == 'recorded_date' else col for col in pollution_daily.columns]
     merged = pd.merge(merged, pollution_daily, on='admission_date', how='left')
 
-# --- 7. Clean Final Output ---
+# --- 7. Readmission episodes (sequence, gap since last discharge, 7/30/90-day flags) ---
+if {'mrd_no', 'doa', 'dod'} <= set(merged.columns):
+    merged = add_readmission_features(merged)
+
+# --- 8. Clean Final Output ---
 master_df = merged.copy()
 
-import ace_tools as tools; tools.display_dataframe_to_user(name="Master Hospital Data Preview", dataframe=master_df)
+display("Master Hospital Data Preview", master_df)
 
 # Save for future steps
-master_df.to_csv("/mnt/data/master_hospital_data.csv", index=False)
+os.makedirs(os.path.dirname(MASTER_DATA), exist_ok=True)
+master_df.to_csv(MASTER_DATA, index=False)
 
 # Descriptive summary of the master hospital data
 summary = {}
@@ -105,9 +137,8 @@ summary['unique_counts'] = unique_counts
 summary['mortality_rate_percent'] = mortality_rate
 
 # Display key components
-import ace_tools as tools
-tools.display_dataframe_to_user(name="Null Value Summary", dataframe=null_summary)
-tools.display_dataframe_to_user(name="Numerical Summary", dataframe=numerical_summary)
-tools.display_dataframe_to_user(name="Categorical Summary", dataframe=categorical_summary)
+display("Null Value Summary", null_summary)
+display("Numerical Summary", numerical_summary)
+display("Categorical Summary", categorical_summary)
 
 mortality_rate
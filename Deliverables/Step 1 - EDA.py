@@ -4,12 +4,16 @@ import seaborn as sns
 import numpy as np
 import warnings
 
+from carepulse.instrument import instrumented
+
 warnings.filterwarnings("ignore")
 sns.set(style="whitegrid")
 
+@instrumented
 class HDHIEDAAdvanced:
     def __init__(self, data):
-        self.df = data.copy()
+        # Shallow copy: with copy-on-write only the columns modified here are duplicated
+        self.df = data.copy(deep=False)
         self.df['duration_of_stay'] = pd.to_numeric(self.df['duration_of_stay'], errors='coerce')
 
     def run_all(self):
@@ -65,7 +69,7 @@ class HDHIEDAAdvanced:
         plt.show()
 
     def correlation_heatmap(self):
-        numeric_cols = self.df.select_dtypes(include=['int64', 'float64']).drop(columns=['sno'], errors='ignore')
+        numeric_cols = self.df.select_dtypes(include='number').drop(columns=['sno'], errors='ignore')
         plt.figure(figsize=(12, 8))
         sns.heatmap(numeric_cols.corr(), cmap='coolwarm', annot=False)
         plt.title("Correlation Heatmap")
@@ -88,8 +92,16 @@ class HDHIEDAAdvanced:
         readmits = self.df['mrd_no'].value_counts()
         print("\n Patients with multiple admissions:")
         print(readmits[readmits > 1])
+        flags = [col for col in ['readmit_7d', 'readmit_30d', 'readmit_90d'] if col in self.df.columns]
+        if flags:
+            print("\n Readmission rate (% of admissions):")
+            print((self.df[flags].mean() * 100).round(2))
 
 if __name__ == "__main__":
-    df = pd.read_csv("master_hospital_data.csv")
+    from carepulse.paths import MASTER_DATA
+    from carepulse.schema import enable_copy_on_write, read_master
+
+    enable_copy_on_write()
+    df = read_master(MASTER_DATA)
     eda = HDHIEDAAdvanced(df)
     eda.run_all()
@@ -4,11 +4,15 @@ from scipy import stats
 from statsmodels.stats.proportion import proportions_ztest
 import warnings
 
+from carepulse.instrument import instrumented
+
 warnings.filterwarnings("ignore")
 
+@instrumented
 class CarePulseStatTests:
     def __init__(self, data):
-        self.df = data.copy()
+        # Shallow copy: with copy-on-write only the columns modified here are duplicated
+        self.df = data.copy(deep=False)
         self.clean_data()
 
     def clean_data(self):
@@ -172,7 +176,11 @@ class CarePulseStatTests:
 
 
 if __name__ == "__main__":
-    df = pd.read_csv("master_hospital_data.csv")
+    from carepulse.paths import MASTER_DATA
+    from carepulse.schema import enable_copy_on_write, read_master
+
+    enable_copy_on_write()
+    df = read_master(MASTER_DATA)
     tester = CarePulseStatTests(df)
     tester.run_all_tests()
 
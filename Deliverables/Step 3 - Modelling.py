@@ -7,18 +7,23 @@ import numpy as np
 import joblib
 from xgboost import XGBClassifier, XGBRegressor
 
+from carepulse.instrument import instrumented
+from carepulse.schema import read_master
+
+@instrumented
 class CarePulseExplainability:
     def __init__(self, data_path, model_mortality, model_los):
-        self.df = pd.read_csv(data_path)
+        self.df = read_master(data_path)
         self.model_mortality = model_mortality
         self.model_los = model_los
 
         # Reuse same feature preprocessing logic
         self.feature_cols = [
             'age', 'gender', 'smoking', 'alcohol', 'dm', 'htn', 'cad', 'ckd',
-            'hb', 'tlc', 'glucose', 'urea', 'creatinine', 'bnp'
+            'hb', 'tlc', 'glucose', 'urea', 'creatinine', 'bnp',
+            'admission_seq', 'readmit_30d'
         ]
-        self.df = self.df[self.feature_cols + ['mortality_flag', 'duration_of_stay']].copy()
+        self.df = self.df[self.feature_cols + ['mortality_flag', 'duration_of_stay']]
         self.df.dropna(inplace=True)
         if 'gender' in self.df.columns:
             self.df['gender'] = self.df['gender'].astype(str).map({'M': 1, 'F': 0}).fillna(0)
@@ -100,13 +105,17 @@ if __name__ == "__main__":
     # los_model = joblib.load("los_model.pkl")
 
     # OR use freshly trained models directly (imported from script 3)
-    from CarePulseModeling import CarePulseModeling  # Make sure script 3 is saved as CarePulseModeling.py
+    from carepulse.paths import MASTER_DATA, load_step
+    from carepulse.schema import enable_copy_on_write
+
+    enable_copy_on_write()
+    CarePulseModeling = load_step("Step 5 - Risk Flagging & Strategic Recommendations.py").CarePulseModeling
 
-    model_obj = CarePulseModeling("master_hospital_data.csv")
+    model_obj = CarePulseModeling(MASTER_DATA)
     model_obj.run_full_pipeline()
 
     explainer = CarePulseExplainability(
-        data_path="master_hospital_data.csv",
+        data_path=MASTER_DATA,
         model_mortality=model_obj.mortality_model,
         model_los=model_obj.los_model
     )
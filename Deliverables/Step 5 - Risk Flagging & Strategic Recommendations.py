@@ -7,16 +7,21 @@ from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from xgboost import XGBClassifier, XGBRegressor
 import warnings
 
+from carepulse.instrument import instrumented
+from carepulse.schema import enable_copy_on_write, read_master
+
 warnings.filterwarnings("ignore")
 
+@instrumented
 class CarePulseModeling:
     def __init__(self, data_path):
-        self.df = pd.read_csv(data_path)
-        self.df_original = self.df.copy()
+        self.df = read_master(data_path)
+        # preprocess_data rebinds self.df, so the loaded frame stays intact without a copy
+        self.df_original = self.df
         self.preprocessed = False
 
     def preprocess_data(self):
-        df = self.df.copy()
+        df = self.df.copy(deep=False)
 
         # Create mortality flag (1 if DEATH, else 0)
         df['mortality_flag'] = np.where(df['outcome'].str.upper() == 'DEATH', 1, 0)
@@ -27,7 +32,8 @@ class CarePulseModeling:
         # Define usable columns based on available data
         features = [
             'age', 'gender', 'smoking', 'alcohol', 'dm', 'htn', 'cad', 'ckd',
-            'hb', 'tlc', 'glucose', 'urea', 'creatinine', 'bnp'
+            'hb', 'tlc', 'glucose', 'urea', 'creatinine', 'bnp',
+            'admission_seq', 'readmit_30d'
         ]
 
         selected_columns = features + ['mortality_flag', 'duration_of_stay', 'mrd_no', 'outcome']
@@ -121,5 +127,8 @@ class CarePulseModeling:
 
 
 if __name__ == "__main__":
-    model_runner = CarePulseModeling("master_hospital_data.csv")
+    from carepulse.paths import MASTER_DATA
+
+    enable_copy_on_write()
+    model_runner = CarePulseModeling(MASTER_DATA)
     model_runner.run_full_pipeline()
@@ -3,19 +3,25 @@ import numpy as np
 from xgboost import XGBClassifier, XGBRegressor
 from sklearn.model_selection import train_test_split
 
+from carepulse.instrument import instrumented
+from carepulse.schema import enable_copy_on_write, read_master
+
+
+@instrumented
 class CarePulseRiskEngine:
     def __init__(self, data_path):
-        self.df = pd.read_csv(data_path)
+        self.df = read_master(data_path)
         self.model_mortality = XGBClassifier(use_label_encoder=False, eval_metric='logloss', base_score=0.5)
         self.model_los = XGBRegressor()
         self.features = [
             'age', 'smoking', 'alcohol', 'dm', 'htn', 'cad', 'ckd',
-            'hb', 'tlc', 'glucose', 'urea', 'creatinine', 'bnp'
+            'hb', 'tlc', 'glucose', 'urea', 'creatinine', 'bnp',
+            'admission_seq', 'readmit_30d'
         ]
         self.result_df = None
 
     def preprocess(self):
-        df = self.df.copy()
+        df = self.df.copy(deep=False)
 
         # Ensure outcome exists
         df['mortality_flag'] = np.where(df['outcome'].astype(str).str.upper() == 'DEATH', 1, 0)
@@ -100,5 +106,8 @@ class CarePulseRiskEngine:
 # Run the Script
 # ------------------------------
 if __name__ == "__main__":
-    engine = CarePulseRiskEngine("master_hospital_data.csv")
+    from carepulse.paths import MASTER_DATA
+
+    enable_copy_on_write()
+    engine = CarePulseRiskEngine(MASTER_DATA)
     engine.run_all()
@@ -1,33 +1,101 @@
+import os
+import json
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from statsmodels.tsa.statespace.sarimax import SARIMAX
-from prophet import Prophet
-from sklearn.metrics import mean_absolute_error, mean_squared_error
 import warnings
 
+from carepulse.instrument import instrumented
+from carepulse.paths import POLLUTION_DATA
+from carepulse.schema import DEATH_OUTCOMES, join_pollution, parse_admission_dates, read_daily_pollution, read_master
+
 warnings.filterwarnings("ignore")
 
+# Plotting, statsmodels, Prophet and scikit-learn are imported inside the methods
+# that use them, so scoring against a saved cluster model only loads numpy/pandas
+
+FORECAST_COLUMNS = ['monthly_admissions', 'avg_los', 'monthly_mortality']
+
+
+def warm_start_params(model):
+    """Extract fitted Prophet parameters so a refit can start from them."""
+    res = {}
+    for pname in ['k', 'm', 'sigma_obs']:
+        res[pname] = model.params[pname][0][0]
+    for pname in ['delta', 'beta']:
+        res[pname] = model.params[pname][0]
+    return res
+
+
+@instrumented
 class HospitalForecasting:
-    def __init__(self, data_path):
-        self.data = pd.read_csv(data_path, parse_dates=["admission_date"])
+    def __init__(self, data_path=None, state_dir="forecast_state"):
+        self.data = self.prepare(read_master(data_path)) if data_path else None
+        self.monthly_parts = None
         self.monthly_df = None
 
+        # Incremental update settings
+        self.state_dir = state_dir
+        self.drift_threshold = 3.0   # |standardized one-step error| that forces a refit
+        self.refit_every = 12        # full refit after this many filter-only updates
+        self.state_meta = {}
+
+        # Models fitted by fit_forecast_states, reused by the forecast plots and evaluation
+        self.sarima_results = {}
+        self.prophet_models = {}
+        self._prophet_forecasts = {}
+
+    @staticmethod
+    def prepare(data):
+        """
+        Admission date, `los` and `mortality_flag` from master columns: doa
+        (resolved against month_year), duration_of_stay and a death outcome.
+        """
+        derived = {}
+        if 'admission_date' not in data.columns:
+            derived['admission_date'] = parse_admission_dates(data)[0]
+        elif not pd.api.types.is_datetime64_any_dtype(data['admission_date']):
+            derived['admission_date'] = pd.to_datetime(data['admission_date'], errors='coerce')
+        if 'los' not in data.columns:
+            derived['los'] = pd.to_numeric(data['duration_of_stay'], errors='coerce')
+        if 'mortality_flag' not in data.columns:
+            derived['mortality_flag'] = data['outcome'].astype(str).str.upper().isin(DEATH_OUTCOMES).astype(np.int8)
+        return data.assign(**derived) if derived else data
+
+    @staticmethod
+    def aggregate_monthly(data):
+        # Additive monthly components, so new admissions can be merged into the cache
+        data = data.assign(month=data['admission_date'].dt.to_period('M').dt.to_timestamp())
+        return data.groupby('month').agg(
+            monthly_admissions=('mrd_no', 'count'),
+            los_sum=('los', 'sum'),
+            los_count=('los', 'count'),
+            monthly_mortality=('mortality_flag', 'sum')
+        ).reset_index()
+
+    def _finalize_monthly(self):
+        parts = self.monthly_parts.sort_values('month').reset_index(drop=True)
+        self.monthly_parts = parts
+        self.monthly_df = pd.DataFrame({
+            'month': parts['month'],
+            'monthly_admissions': parts['monthly_admissions'],
+            'avg_los': parts['los_sum'] / parts['los_count'].replace(0, np.nan),
+            'monthly_mortality': parts['monthly_mortality']
+        })
+
+    def _monthly_series(self, column):
+        # Regular monthly index, required for appending observations to a fitted state
+        return self.monthly_df.set_index('month')[column].asfreq('MS')
+
     def preprocess(self):
         print("Preprocessing and aggregating monthly trends...")
-        self.data['month'] = self.data['admission_date'].dt.to_period('M').dt.to_timestamp()
-        self.monthly_df = self.data.groupby('month').agg({
-            'mrd_no': 'count',
-            'los': 'mean',
-            'mortality_flag': 'sum'
-        }).rename(columns={
-            'mrd_no': 'monthly_admissions',
-            'los': 'avg_los',
-            'mortality_flag': 'monthly_mortality'
-        }).reset_index()
+        self.monthly_parts = self.aggregate_monthly(self.data)
+        self._finalize_monthly()
         print(self.monthly_df.head())
 
     def plot_trends(self):
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
         print("Plotting monthly trends...")
         fig, axs = plt.subplots(3, 1, figsize=(12, 10))
         sns.lineplot(x='month', y='monthly_admissions', data=self.monthly_df, ax=axs[0])
@@ -43,11 +111,15 @@ class HospitalForecasting:
         plt.show()
 
     def forecast_with_sarima(self, column):
+        import matplotlib.pyplot as plt
+        from statsmodels.tsa.statespace.sarimax import SARIMAX
+
         print(f"\n--- Forecasting {column} using SARIMA ---")
-        ts = self.monthly_df.set_index('month')[column]
+        ts = self._monthly_series(column)
 
-        model = SARIMAX(ts, order=(1, 1, 1), seasonal_order=(1, 1, 1, 12))
-        results = model.fit()
+        results = self.sarima_results.get(column)
+        if results is None:
+            results = SARIMAX(ts, order=(1, 1, 1), seasonal_order=(1, 1, 1, 12)).fit()
 
         forecast = results.get_forecast(steps=6)
         pred = forecast.predicted_mean
@@ -61,45 +133,417 @@ class HospitalForecasting:
         plt.legend()
         plt.show()
 
+    def _prophet_forecast(self, column):
+        # One Prophet fit and prediction per column, shared by the plot and the evaluation
+        if column not in self._prophet_forecasts:
+            model = self.prophet_models.get(column)
+            if model is None:
+                from prophet import Prophet
+
+                model = Prophet()
+                model.fit(self.monthly_df[['month', column]].rename(columns={'month': 'ds', column: 'y'}))
+                self.prophet_models[column] = model
+            future = model.make_future_dataframe(periods=6, freq='M')
+            self._prophet_forecasts[column] = model.predict(future)
+        return self.prophet_models[column], self._prophet_forecasts[column]
+
     def forecast_with_prophet(self, column):
-        print(f"\n--- Forecasting {column} using Facebook Prophet ---")
-        prophet_df = self.monthly_df[['month', column]].rename(columns={'month': 'ds', column: 'y'})
-        model = Prophet()
-        model.fit(prophet_df)
+        import matplotlib.pyplot as plt
 
-        future = model.make_future_dataframe(periods=6, freq='M')
-        forecast = model.predict(future)
+        print(f"\n--- Forecasting {column} using Facebook Prophet ---")
+        model, forecast = self._prophet_forecast(column)
 
         model.plot(forecast)
         plt.title(f"6-Month Forecast for {column} (Prophet)")
         plt.show()
 
     def evaluate(self, column):
-        print(f"\nEvaluating model performance on {column} (Prophet)...")
-        prophet_df = self.monthly_df[['month', column]].rename(columns={'month': 'ds', column: 'y'})
-        model = Prophet()
-        model.fit(prophet_df)
+        from sklearn.metrics import mean_absolute_error, mean_squared_error
 
-        future = model.make_future_dataframe(periods=6, freq='M')
-        forecast = model.predict(future)
+        print(f"\nEvaluating model performance on {column} (Prophet)...")
+        _, forecast = self._prophet_forecast(column)
 
-        actual = prophet_df['y'][-6:].values
+        actual = self.monthly_df[column][-6:].values
         predicted = forecast['yhat'][-12:-6].values  # Compare with last 6 known
 
         mae = mean_absolute_error(actual, predicted)
         rmse = mean_squared_error(actual, predicted, squared=False)
         print(f"MAE: {mae:.2f} | RMSE: {rmse:.2f}")
 
+    # ------------------------------
+    # Incremental (warm-start) updates
+    # ------------------------------
+    def _state_path(self, name):
+        return os.path.join(self.state_dir, name)
+
+    def save_state(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        self.monthly_parts.to_csv(self._state_path("monthly_parts.csv"), index=False)
+        with open(self._state_path("state_meta.json"), "w") as f:
+            json.dump(self.state_meta, f, indent=2)
+
+    def load_state(self):
+        self.monthly_parts = pd.read_csv(self._state_path("monthly_parts.csv"), parse_dates=['month'])
+        with open(self._state_path("state_meta.json")) as f:
+            self.state_meta = json.load(f)
+        self._finalize_monthly()
+
+    def _fit_sarima_state(self, column):
+        from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+        results = SARIMAX(self._monthly_series(column), order=(1, 1, 1),
+                          seasonal_order=(1, 1, 1, 12)).fit(disp=False)
+        results.save(self._state_path(f"sarima_{column}.pkl"))
+        return results
+
+    def _fit_prophet_state(self, column, previous=None):
+        from prophet import Prophet
+        from prophet.serialize import model_to_json
+
+        prophet_df = self.monthly_df[['month', column]].rename(columns={'month': 'ds', column: 'y'})
+        model = Prophet()
+        # Warm start from the previous fit converges in a handful of iterations
+        model.fit(prophet_df, init=warm_start_params(previous) if previous is not None else None)
+        with open(self._state_path(f"prophet_{column}.json"), "w") as f:
+            f.write(model_to_json(model))
+        return model
+
+    def fit_forecast_states(self):
+        """Full fit of every forecast model, persisted for later incremental updates."""
+        print("Fitting and persisting forecast states...")
+        if self.monthly_df is None:
+            self.preprocess()
+        os.makedirs(self.state_dir, exist_ok=True)
+
+        last_month = str(self.monthly_df['month'].max().date())
+        for column in FORECAST_COLUMNS:
+            self.sarima_results[column] = self._fit_sarima_state(column)
+            self.prophet_models[column] = self._fit_prophet_state(column)
+            self._prophet_forecasts.pop(column, None)
+            self.state_meta[column] = {'last_month': last_month, 'updates_since_refit': 0}
+        self.save_state()
+
+    def _detect_drift(self, results, new_obs):
+        forecast = results.get_forecast(steps=len(new_obs))
+        errors = (new_obs.values - forecast.predicted_mean.values) / np.sqrt(forecast.var_pred_mean.values)
+        return bool(np.nanmax(np.abs(errors)) > self.drift_threshold)
+
+    def update(self, new_data, steps=6):
+        """
+        Extend persisted forecast states with newly landed admissions.
+
+        Only the new rows are aggregated and merged into the cached monthly
+        table. SARIMA states are extended by a Kalman filter pass with the
+        existing parameters; a full refit only happens on drift, on revised
+        history, or every `refit_every` updates. Prophet is refit warm-started
+        from its previous parameters only when the SARIMA state is refit.
+        """
+        print("Updating forecast states with new admissions...")
+        self.load_state()
+        new_parts = self.aggregate_monthly(self.prepare(new_data))
+        self.monthly_parts = pd.concat([self.monthly_parts, new_parts]).groupby('month', as_index=False).sum()
+        self._finalize_monthly()
+        return self._extend_states(new_parts['month'].min(), steps)
+
+    def has_state(self):
+        return os.path.exists(self._state_path("state_meta.json"))
+
+    def refresh(self, data, steps=6):
+        """
+        Bring persisted forecast states in line with the full admissions table.
+
+        The monthly aggregates of `data` are compared with the cached ones and
+        only the months that differ are passed on as in `update`, so a rerun
+        over a grown master file filters the new months into the saved states
+        instead of refitting every model.
+        """
+        print("Refreshing forecast states from the admissions table...")
+        self.load_state()
+        parts = self.aggregate_monthly(self.prepare(data))
+        cached = self.monthly_parts.set_index('month')
+        current = parts.set_index('month')
+        months = cached.index.union(current.index)
+        changed = ~(cached.reindex(months).fillna(0) == current.reindex(months).fillna(0)).all(axis=1)
+        self.monthly_parts = parts
+        self._finalize_monthly()
+        return self._extend_states(months[changed.to_numpy()].min() if changed.any() else None, steps)
+
+    def _extend_states(self, first_changed_month, steps):
+        # `first_changed_month` is None when the monthly table did not change
+        from statsmodels.tsa.statespace.sarimax import SARIMAXResults
+
+        forecasts = {}
+        for column in FORECAST_COLUMNS:
+            meta = self.state_meta[column]
+            last_month = pd.Timestamp(meta['last_month'])
+            results = SARIMAXResults.load(self._state_path(f"sarima_{column}.pkl"))
+            new_obs = self._monthly_series(column).loc[last_month + pd.offsets.MonthBegin(1):]
+
+            revised = first_changed_month is not None and first_changed_month <= last_month
+            refit = revised or bool(len(new_obs) and (meta['updates_since_refit'] + 1 >= self.refit_every
+                                                      or self._detect_drift(results, new_obs)))
+
+            if refit:
+                # Prophet is only loaded when a refit needs it; a filter-only update stays cheap
+                from prophet.serialize import model_from_json
+
+                print(f"Full refit for {column}")
+                results = self._fit_sarima_state(column)
+                with open(self._state_path(f"prophet_{column}.json")) as f:
+                    previous = model_from_json(f.read())
+                self._fit_prophet_state(column, previous=previous)
+                meta['updates_since_refit'] = 0
+            elif len(new_obs):
+                results = results.append(new_obs, refit=False)
+                results.save(self._state_path(f"sarima_{column}.pkl"))
+                meta['updates_since_refit'] += 1
+
+            meta['last_month'] = str(self.monthly_df['month'].max().date())
+            forecasts[column] = results.get_forecast(steps=steps).predicted_mean
+
+        self.save_state()
+        return pd.DataFrame(forecasts)
+
     def run_all(self):
         self.preprocess()
+        # Persisted states let later runs add new admissions with `update` instead of refitting
+        self.fit_forecast_states()
         self.plot_trends()
 
-        for column in ['monthly_admissions', 'avg_los', 'monthly_mortality']:
+        for column in FORECAST_COLUMNS:
             self.forecast_with_sarima(column)
             self.forecast_with_prophet(column)
             self.evaluate(column)
 
 
+# ------------------------------
+# Patient Risk Segmentation
+# ------------------------------
+LAB_FEATURES = ['hb', 'tlc', 'platelets', 'glucose', 'urea', 'creatinine', 'bnp', 'ef']
+COMORBIDITY_FEATURES = [
+    'smoking', 'alcohol', 'dm', 'htn', 'cad', 'prior_cmp', 'ckd', 'raised_cardiac_enzymes',
+    'severe_anaemia', 'anaemia', 'heart_failure', 'aki', 'af', 'cardiogenic_shock', 'shock'
+]
+# Daily averages of the admission day, joined from HDHI Pollution Data.csv
+POLLUTION_FEATURES = ['aqi', 'pm25', 'pm10', 'no2', 'so2']
+CLUSTER_FEATURES = ['age'] + LAB_FEATURES + COMORBIDITY_FEATURES + POLLUTION_FEATURES
+
+
+@instrumented(exclude=("assign", "assign_matrix", "assign_frame", "score"))
+class CarePulseRiskClustering:
+    """
+    Streaming k-means segmentation over lab, comorbidity and pollution features.
+
+    The master file is read in chunks: one pass fits the scaler, `n_epochs`
+    passes train MiniBatchKMeans with partial_fit, and a final pass assigns
+    every admission and accumulates per-cluster outcome profiles. Memory is
+    bounded by `chunk_size` regardless of cohort size. The master file has no
+    pollution columns, so each chunk is joined to the pollution file's
+    readings for the admission day.
+
+    `save_model` keeps the fitted centres, scaling and profiles as JSON;
+    `load_model` reopens them for scoring without scikit-learn.
+    """
+
+    def __init__(self, data_path, n_clusters=6, chunk_size=100000, n_epochs=2, random_state=42,
+                 pollution_path=POLLUTION_DATA):
+        self.data_path = data_path
+        self.pollution_path = pollution_path
+        self._pollution = None
+        self.n_clusters = n_clusters
+        self.chunk_size = chunk_size
+        self.n_epochs = n_epochs
+        self.random_state = random_state
+        self.features = None
+        self.scaler = None
+        self.kmeans = None
+        self.cluster_profiles = None
+
+        # Flat arrays for the single-patient fast path
+        self._mean = None
+        self._scale = None
+        self._centers = None
+        self._center_norms = None
+
+    def _iter_chunks(self):
+        if self.features is None:
+            self.features = list(CLUSTER_FEATURES)
+        for chunk in read_master(self.data_path, chunksize=self.chunk_size, low_memory=False):
+            if not set(POLLUTION_FEATURES) <= set(chunk.columns):
+                if self._pollution is None:
+                    self._pollution = read_daily_pollution(self.pollution_path)[POLLUTION_FEATURES]
+                chunk = join_pollution(chunk, self._pollution)
+            missing = [col for col in self.features if col not in chunk.columns]
+            if missing:
+                raise ValueError(f"Cannot build clustering features {missing} from {self.data_path}")
+            X = chunk[self.features].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float32)
+            yield chunk, X
+
+    def _scale_chunk(self, X):
+        # Missing values land on the feature mean (0 after scaling)
+        return np.nan_to_num((X - self._mean) / self._scale, nan=0.0).astype(np.float32)
+
+    def fit(self):
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.preprocessing import StandardScaler
+
+        self.scaler = StandardScaler()
+        self.kmeans = MiniBatchKMeans(n_clusters=self.n_clusters, random_state=self.random_state, n_init=3)
+        print("Fitting feature scaler over chunks...")
+        for _, X in self._iter_chunks():
+            self.scaler.partial_fit(X)
+        self._mean = self.scaler.mean_.astype(np.float32)
+        self._scale = np.where(self.scaler.scale_ > 0, self.scaler.scale_, 1.0).astype(np.float32)
+
+        print(f"Training mini-batch k-means (k={self.n_clusters})...")
+        for _ in range(self.n_epochs):
+            for _, X in self._iter_chunks():
+                if len(X) >= self.n_clusters:
+                    self.kmeans.partial_fit(self._scale_chunk(X))
+
+        self._centers = self.kmeans.cluster_centers_.astype(np.float32)
+        self._center_norms = (self._centers ** 2).sum(axis=1)
+
+    def assign_matrix(self, X_scaled):
+        # argmin ||x - c||^2 == argmin (||c||^2 - 2 x.c); one small matmul per batch
+        return np.argmin(self._center_norms - 2.0 * X_scaled @ self._centers.T, axis=1)
+
+    def assign(self, patient):
+        """Assign a single admission (dict or Series of raw values) to a risk segment."""
+        x = np.array([patient.get(f, np.nan) for f in self.features], dtype=np.float32)
+        x = np.nan_to_num((x - self._mean) / self._scale, nan=0.0)
+        return int(np.argmin(self._center_norms - 2.0 * (self._centers @ x)))
+
+    def score(self, patient):
+        """Risk segment of a single admission, with that segment's outcome profile."""
+        cluster = self.assign(patient)
+        result = {'risk_cluster': cluster}
+        if self.cluster_profiles is not None:
+            profiles = self.cluster_profiles.set_index('risk_cluster')
+            result.update({col: profiles.at[cluster, col] for col in ['risk_rank', 'admissions', 'mortality_rate',
+                                                                      'avg_los', 'avg_icu_stay']})
+        return result
+
+    def assign_frame(self, df):
+        X = df[self.features].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float32)
+        return self.assign_matrix(self._scale_chunk(X))
+
+    def profile_clusters(self, output_path="patient_risk_clusters.csv"):
+        """Assign every admission and build per-cluster outcome profiles in one pass."""
+        print("Assigning admissions and profiling clusters...")
+        k = self.n_clusters
+        counts = np.zeros(k)
+        deaths = np.zeros(k)
+        los_sum, los_n = np.zeros(k), np.zeros(k)
+        icu_sum, icu_n = np.zeros(k), np.zeros(k)
+        feature_sums = np.zeros((k, len(self.features) if self.features else 0))
+
+        header = True
+        with open(output_path, "w", newline="") as f:
+            for chunk, X in self._iter_chunks():
+                labels = self.assign_matrix(self._scale_chunk(X))
+                counts += np.bincount(labels, minlength=k)
+
+                if 'outcome' in chunk.columns:
+                    died = chunk['outcome'].astype(str).str.upper().isin(DEATH_OUTCOMES).to_numpy()
+                    deaths += np.bincount(labels, weights=died, minlength=k)
+                for col, sums, ns in [('duration_of_stay', los_sum, los_n),
+                                      ('duration_of_intensive_unit_stay', icu_sum, icu_n)]:
+                    if col in chunk.columns:
+                        values = pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype=float)
+                        valid = ~np.isnan(values)
+                        sums += np.bincount(labels[valid], weights=values[valid], minlength=k)
+                        ns += np.bincount(labels[valid], minlength=k)
+
+                filled = np.where(np.isnan(X), self._mean, X)
+                if not feature_sums.size:
+                    feature_sums = np.zeros((k, X.shape[1]))
+                for j in range(X.shape[1]):
+                    feature_sums[:, j] += np.bincount(labels, weights=filled[:, j], minlength=k)
+
+                pd.DataFrame({'mrd_no': chunk['mrd_no'].to_numpy(), 'risk_cluster': labels}).to_csv(
+                    f, index=False, header=header)
+                header = False
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            profiles = pd.DataFrame(feature_sums / counts[:, None], columns=[f"mean_{c}" for c in self.features])
+            profiles.insert(0, 'admissions', counts.astype(int))
+            profiles.insert(1, 'mortality_rate', 100.0 * deaths / counts)
+            profiles.insert(2, 'avg_los', los_sum / los_n)
+            profiles.insert(3, 'avg_icu_stay', icu_sum / icu_n)
+        profiles.index.name = 'risk_cluster'
+        profiles['risk_rank'] = profiles['mortality_rate'].rank(ascending=False, method='first').astype('Int64')
+        self.cluster_profiles = profiles.reset_index()
+
+        print("\n--- Risk Cluster Profiles ---")
+        print(self.cluster_profiles[['risk_cluster', 'risk_rank', 'admissions', 'mortality_rate',
+                                     'avg_los', 'avg_icu_stay']].sort_values('risk_rank'))
+        print(f"Cluster assignments written to: {output_path}")
+        return self.cluster_profiles
+
+    def save_model(self, model_dir="risk_cluster_model"):
+        os.makedirs(model_dir, exist_ok=True)
+        state = {
+            'features': self.features,
+            'mean': self._mean.tolist(),
+            'scale': self._scale.tolist(),
+            'centers': self._centers.tolist(),
+            'profiles': None if self.cluster_profiles is None else json.loads(
+                self.cluster_profiles.to_json(orient='records'))
+        }
+        path = os.path.join(model_dir, "model.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(path + ".tmp", path)
+        print(f"Cluster model saved to: {model_dir}")
+
+    @classmethod
+    def load_model(cls, model_dir="risk_cluster_model", data_path=None):
+        with open(os.path.join(model_dir, "model.json")) as f:
+            state = json.load(f)
+        model = cls(data_path, n_clusters=len(state['centers']))
+        model.features = state['features']
+        model._mean = np.array(state['mean'], dtype=np.float32)
+        model._scale = np.array(state['scale'], dtype=np.float32)
+        model._centers = np.array(state['centers'], dtype=np.float32)
+        model._center_norms = (model._centers ** 2).sum(axis=1)
+        if state['profiles'] is not None:
+            model.cluster_profiles = pd.DataFrame(state['profiles'])
+        return model
+
+    def run_all(self):
+        self.fit()
+        self.profile_clusters()
+        self.save_model()
+
+
 if __name__ == "__main__":
-    forecaster = HospitalForecasting("master_hospital_data.csv")
-    forecaster.run_all()
+    import argparse
+
+    from carepulse.paths import MASTER_DATA
+
+    parser = argparse.ArgumentParser(description="Hospital forecasting and patient risk clustering")
+    parser.add_argument("part", nargs="?", choices=["all", "forecast", "clusters"], default="all")
+    parser.add_argument("--update", metavar="NEW_ADMISSIONS",
+                        help="CSV of newly landed admissions: extend the saved forecast states instead of refitting")
+    parser.add_argument("--state-dir", default="forecast_state")
+    parser.add_argument("--refit", action="store_true",
+                        help="refit every forecast model even when saved states exist")
+    args = parser.parse_args()
+
+    if args.update:
+        forecaster = HospitalForecasting(state_dir=args.state_dir)
+        print(forecaster.update(read_master(args.update)))
+    else:
+        # The clustering does not depend on the forecasts, so it runs (and saves its model) first
+        if args.part in ("all", "clusters"):
+            clustering = CarePulseRiskClustering(MASTER_DATA)
+            clustering.run_all()
+
+        if args.part in ("all", "forecast"):
+            forecaster = HospitalForecasting(MASTER_DATA, state_dir=args.state_dir)
+            # Reruns (e.g. the pipeline's, whose working dir keeps the states) only fold in changed months
+            if forecaster.has_state() and not args.refit:
+                print(forecaster.refresh(forecaster.data))
+            else:
+                forecaster.run_all()
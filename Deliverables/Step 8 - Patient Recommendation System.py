@@ -1,104 +1,611 @@
 # Filename: 8_Patient_Recommendation_System.py
 
+import os
+import json
+import pickle
+import threading
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import StandardScaler
+from concurrent.futures import ThreadPoolExecutor
 import warnings
 
+from carepulse.instrument import instrumented
+from carepulse.paths import POLLUTION_DATA
+from carepulse.schema import DEATH_OUTCOMES, enable_copy_on_write, join_pollution, read_daily_pollution, read_master
+
 warnings.filterwarnings("ignore")
 
+# scikit-learn is imported where a tree is built or a scaler fitted; opening a
+# saved index and answering exact queries only needs numpy/pandas
+
+
+def _atomic_save(path, writer):
+    # Write next to the target and swap in, so readers never see a partial file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        writer(f)
+    os.replace(tmp_path, path)
+
+
+class PatientSimilarityIndex:
+    """
+    Cosine top-k index over patient feature vectors.
+
+    Vectors are L2-normalized once and stored as float32, so memory is linear
+    in the number of patients. On the unit sphere euclidean distance is
+    monotonic in cosine similarity (cos = 1 - d^2 / 2), which lets a KD-tree
+    answer single-patient queries without scoring the whole cohort. Batches
+    of queries use blocked matrix products with argpartition instead.
+
+    Rows added after the tree was built live in a small delta segment that is
+    scanned exactly on every query, until `compact()` folds it into the tree.
+    Positions are stable: delta rows keep their position after compaction.
+    """
+
+    def __init__(self, vectors, block_size=8192, normalized=False, tree_path=None):
+        self.vectors = vectors if normalized else self.normalize(vectors)
+        self.block_size = block_size
+        self.delta = np.empty((0, self.vectors.shape[1]), dtype=np.float32)
+        self._tree = None
+        self._tree_path = tree_path
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, np.finfo(np.float32).tiny)
+
+    @property
+    def tree(self):
+        # Built (or unpickled) on first use, so opening a saved index stays cheap
+        if self._tree is None:
+            if self._tree_path is not None:
+                with open(self._tree_path, "rb") as f:
+                    self._tree = pickle.load(f)
+            else:
+                from sklearn.neighbors import KDTree
+                self._tree = KDTree(self.vectors)
+        return self._tree
+
+    def __len__(self):
+        return len(self.vectors) + len(self.delta)
+
+    def vector(self, position):
+        n_main = len(self.vectors)
+        return self.vectors[position] if position < n_main else self.delta[position - n_main]
+
+    def add(self, vectors):
+        """Insert new rows into the delta segment; returns their positions."""
+        unit = self.normalize(np.atleast_2d(vectors))
+        with self._lock:
+            start = len(self)
+            self.delta = np.vstack([self.delta, unit])
+        return np.arange(start, start + len(unit))
+
+    def compact(self, n=None):
+        """
+        Fold the first `n` delta rows (default: all of them) into the main
+        segment and rebuild the tree. Returns the number of rows folded.
+        """
+        with self._lock:
+            vectors, delta = self.vectors, self.delta[:n]
+        if not len(delta):
+            return 0
+        from sklearn.neighbors import KDTree
+
+        merged = np.vstack([vectors, delta])
+        tree = KDTree(merged)
+        with self._lock:
+            self.vectors, self._tree, self._tree_path = merged, tree, None
+            # Rows inserted while the tree was being built stay in the delta
+            self.delta = self.delta[len(delta):]
+        return len(delta)
+
+    def save(self, index_dir):
+        """Persist the main segment; call `compact()` first to include the delta."""
+        os.makedirs(index_dir, exist_ok=True)
+        _atomic_save(os.path.join(index_dir, "vectors.npy"), lambda f: np.save(f, self.vectors))
+        _atomic_save(os.path.join(index_dir, "tree.pkl"), lambda f: pickle.dump(self.tree, f, protocol=5))
+
+    @classmethod
+    def load(cls, index_dir, block_size=8192):
+        """Memory-map a saved index; the tree itself is loaded on the first query."""
+        vectors = np.load(os.path.join(index_dir, "vectors.npy"), mmap_mode="r")
+        return cls(vectors, block_size=block_size, normalized=True,
+                   tree_path=os.path.join(index_dir, "tree.pkl"))
+
+    def query(self, vector, k=5, exact=False):
+        """
+        Return (row positions, cosine scores) of the k nearest rows, best first.
+        `exact` scans the vectors instead of loading the tree, which is cheaper
+        for a one-off query against a saved index.
+        """
+        if exact:
+            idx, scores = self.query_block(np.atleast_2d(vector), k=k)
+            return idx[0], scores[0]
+        unit = self.normalize(np.atleast_2d(vector))
+        with self._lock:
+            tree, delta, n_main = self.tree, self.delta, len(self.vectors)
+        dist, ind = tree.query(unit, k=min(k, n_main))
+        idx, scores = ind[0], 1.0 - dist[0] ** 2 / 2.0
+
+        if len(delta):
+            idx = np.concatenate([idx, np.arange(n_main, n_main + len(delta))])
+            scores = np.concatenate([scores, delta @ unit[0]])
+            order = np.argsort(-scores, kind="stable")[:k]
+            idx, scores = idx[order], scores[order]
+        return idx, scores
+
+    def query_block(self, queries, k=5):
+        """Exact top-k for a block of query vectors via one matrix product."""
+        unit = self.normalize(queries)
+        with self._lock:
+            vectors, delta = self.vectors, self.delta
+        k = min(k, len(vectors) + len(delta))
+        top_idx = np.empty((len(unit), k), dtype=np.int64)
+        top_scores = np.empty((len(unit), k), dtype=np.float32)
+
+        for start in range(0, len(unit), self.block_size):
+            stop = min(start + self.block_size, len(unit))
+            scores = unit[start:stop] @ vectors.T
+            if len(delta):
+                scores = np.hstack([scores, unit[start:stop] @ delta.T])
+            part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            part_scores = np.take_along_axis(scores, part, axis=1)
+            order = np.argsort(-part_scores, axis=1)
+            top_idx[start:stop] = np.take_along_axis(part, order, axis=1)
+            top_scores[start:stop] = np.take_along_axis(part_scores, order, axis=1)
+        return top_idx, top_scores
+
+    def iter_all_top_k(self, k=5, n_jobs=None):
+        """
+        Yield (start, neighbour positions, scores) for every row of the main
+        segment, excluding itself; call `compact()` first to include the delta.
+
+        Rows are queried against the KD-tree in blocks of `block_size`, which
+        keeps the cost near n log n and memory bounded by the block. The tree
+        query releases the GIL, so a thread pool spreads the blocks across
+        cores without copying the corpus into each worker.
+        """
+        n_jobs = n_jobs or os.cpu_count() or 1
+        with self._lock:
+            vectors, tree = self.vectors, self.tree
+        starts = range(0, len(vectors), self.block_size)
+
+        def run_block(start):
+            stop = min(start + self.block_size, len(vectors))
+            dist, idx = tree.query(vectors[start:stop], k=min(k + 1, len(vectors)))
+            scores = 1.0 - dist ** 2 / 2.0
+            # Drop the self match; if a tie pushed it out of the top k+1, drop the last column
+            is_self = idx == np.arange(start, stop)[:, None]
+            is_self[~is_self.any(axis=1), -1] = True
+            keep = ~is_self
+            return (start, idx[keep].reshape(len(idx), -1)[:, :k],
+                    scores[keep].reshape(len(idx), -1)[:, :k])
+
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            # Bounded window of in-flight blocks keeps memory flat
+            pending = []
+            for start in starts:
+                pending.append(pool.submit(run_block, start))
+                if len(pending) >= 2 * n_jobs:
+                    yield pending.pop(0).result()
+            for future in pending:
+                yield future.result()
+
+
+# Declarative intervention rules; thresholds are in raw clinical units
+INTERVENTION_RULES = pd.DataFrame([
+    ('pollution_pm25', '>', 100, "Air purifier recommended / transfer to cleaner ward", 2),
+    ('los', '>', 10, "Flag for long-stay review and infection monitoring", 2),
+    ('age', '>', 65, "Geriatric support plan initiation", 3),
+    ('mortality_flag', '==', 1, "Retrospective review for critical event prevention", 1),
+], columns=['feature', 'operator', 'threshold', 'suggestion', 'priority'])
+
+DEFAULT_SUGGESTION = "Maintain standard monitoring and care"
+
+SIMILARITY_FEATURES = ['age', 'gender', 'los', 'pollution_pm25', 'pollution_no2', 'pollution_o3']
+# Daily averages in HDHI Pollution Data.csv behind the pollution features
+POLLUTION_FEATURES = ['pm25', 'no2', 'o3']
+
+
+class InterventionRuleEngine:
+    """
+    Compiles a rule table into vectorized masks over a whole cohort.
+
+    Rules sharing a feature and operator are evaluated together as one
+    broadcast comparison (rows x rules), chunked over rows so memory stays
+    bounded for large rule sets. Only the hits are materialized, giving a
+    sparse patient-to-suggestion table.
+    """
+
+    OPERATORS = {
+        '>': np.greater, '>=': np.greater_equal,
+        '<': np.less, '<=': np.less_equal,
+        '==': np.equal, '!=': np.not_equal
+    }
+
+    def __init__(self, rules=INTERVENTION_RULES, chunk_size=250000):
+        unknown = set(rules['operator']) - set(self.OPERATORS)
+        if unknown:
+            raise ValueError(f"Unsupported rule operators: {sorted(unknown)}")
+        self.rules = rules.reset_index(drop=True)
+        self.chunk_size = chunk_size
+        self.groups = [
+            (feature, self.OPERATORS[op], group.index.to_numpy(), group['threshold'].to_numpy(dtype=float))
+            for (feature, op), group in self.rules.groupby(['feature', 'operator'], sort=False)
+        ]
+
+    @classmethod
+    def from_csv(cls, path, **kwargs):
+        return cls(pd.read_csv(path), **kwargs)
+
+    def evaluate(self, frame, id_col='mrd_no'):
+        """Return (mrd_no, rule_id, suggestion, priority) for every rule hit, plus defaults."""
+        row_hits, rule_hits = [], []
+        for start in range(0, len(frame), self.chunk_size):
+            chunk = frame.iloc[start:start + self.chunk_size]
+            for feature, op, rule_ids, thresholds in self.groups:
+                values = chunk[feature].to_numpy(dtype=float)
+                rows, cols = np.nonzero(op(values[:, None], thresholds[None, :]))
+                row_hits.append(rows + start)
+                rule_hits.append(rule_ids[cols])
+
+        rows = np.concatenate(row_hits) if row_hits else np.empty(0, dtype=np.int64)
+        rule_ids = np.concatenate(rule_hits) if rule_hits else np.empty(0, dtype=np.int64)
+        hits = pd.DataFrame({
+            id_col: frame[id_col].to_numpy()[rows],
+            'row': rows,
+            'rule_id': rule_ids,
+            'suggestion': self.rules['suggestion'].to_numpy()[rule_ids],
+            'priority': self.rules['priority'].to_numpy()[rule_ids]
+        })
+
+        # Patients without any hit get the standard-care suggestion
+        quiet = np.setdiff1d(np.arange(len(frame)), rows)
+        defaults = pd.DataFrame({
+            id_col: frame[id_col].to_numpy()[quiet], 'row': quiet, 'rule_id': -1,
+            'suggestion': DEFAULT_SUGGESTION, 'priority': self.rules['priority'].max() + 1
+        })
+        table = pd.concat([hits, defaults], ignore_index=True)
+        return table.sort_values(['row', 'priority'], kind='stable').drop(columns='row').reset_index(drop=True)
+
+
+class StoredScaler:
+    """StandardScaler parameters restored from scaler.json, applied with numpy."""
+
+    def __init__(self, mean, scale):
+        self.mean_ = np.asarray(mean, dtype=float)
+        self.scale_ = np.asarray(scale, dtype=float)
+        self.n_features_in_ = len(self.mean_)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=float) - self.mean_) / self.scale_
+
+    def inverse_transform(self, X):
+        return np.asarray(X, dtype=float) * self.scale_ + self.mean_
+
+
+@instrumented
 class PatientRecommender:
-    def __init__(self, data_path):
-        self.raw_data = pd.read_csv(data_path)
+    def __init__(self, data_path=None, index_dir="recommender_index", pollution_path=POLLUTION_DATA):
+        self.raw_data = read_master(data_path) if data_path else None
+        self.pollution_path = pollution_path
         self.df = None
         self.features = None
-        self.similarity_matrix = None
+        self.scaler = None
+        self.index = None
+        self.rule_engine = InterventionRuleEngine()
+
+        # Per-position patient profiles (main segment may be memory-mapped)
+        self.profile_ids = None
+        self.profile_features = None
+        self.profile_mortality = None
+        self.sorted_ids = None
+        self.sorted_order = None
+        self.delta_profiles = None
+        self.delta_lookup = {}
+
+        # Persistence and online inserts
+        self.index_dir = index_dir
+        self.persistent = False
+        self.compact_threshold = 10000
+        self._lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        self._compaction = None
+
+    def derive_features(self, df):
+        """
+        Add the similarity and rule columns the master dataset does not carry:
+        `los` from duration_of_stay, `mortality_flag` from a death outcome and
+        the day's PM2.5 / NO2 / ozone averages joined on the admission date.
+        """
+        df = df.copy(deep=False)
+        if 'los' not in df.columns and 'duration_of_stay' in df.columns:
+            df['los'] = df['duration_of_stay']
+        if 'mortality_flag' not in df.columns and 'outcome' in df.columns:
+            df['mortality_flag'] = df['outcome'].astype(str).str.upper().isin(DEATH_OUTCOMES).astype(np.int8)
+        pollution_cols = ['pollution_' + col for col in POLLUTION_FEATURES]
+        if not set(pollution_cols) <= set(df.columns) and {'doa', 'dod'} <= set(df.columns) \
+                and self.pollution_path and os.path.exists(self.pollution_path):
+            df = join_pollution(df, read_daily_pollution(self.pollution_path)[POLLUTION_FEATURES], prefix='pollution_')
+
+        missing = [col for col in SIMILARITY_FEATURES if col not in df.columns]
+        if missing:
+            raise ValueError(f"Cannot build similarity features {missing}: the data needs duration_of_stay, "
+                             f"doa/dod and a pollution file ({self.pollution_path}) or the columns themselves")
+        return df
 
     def preprocess(self):
         print("🔹 Preprocessing for recommendation system...")
-        df = self.raw_data.copy()
+        df = self.derive_features(self.raw_data)
 
-        # Encode categorical variables
-        df['gender'] = df['gender'].map({'M': 0, 'F': 1})
+        # Encode categorical variables (gender is a categorical, so map yields one too)
+        df['gender'] = df['gender'].map({'M': 0, 'F': 1}).astype(float)
 
         # Drop rows with missing values in core columns
-        df = df.dropna(subset=[
-            'age', 'gender', 'los',
-            'pollution_pm25', 'pollution_no2', 'pollution_o3'
-        ])
+        df = df.dropna(subset=SIMILARITY_FEATURES)
 
         # Define feature vector for similarity
-        self.features = [
-            'age', 'gender', 'los',
-            'pollution_pm25', 'pollution_no2', 'pollution_o3'
-        ]
+        self.features = list(SIMILARITY_FEATURES)
 
         # Normalize
-        scaler = StandardScaler()
-        scaled_features = scaler.fit_transform(df[self.features])
+        from sklearn.preprocessing import StandardScaler
+        self.scaler = StandardScaler()
+        scaled_features = self.scaler.fit_transform(df[self.features])
 
         self.df = df.reset_index(drop=True)
         self.df[self.features] = scaled_features
         print("Data is normalized and ready.")
 
     def compute_similarity(self):
-        print("🔹 Computing patient similarity matrix...")
-        self.similarity_matrix = cosine_similarity(self.df[self.features])
-        print("✅ Similarity matrix created.")
+        print("🔹 Building nearest-patient index...")
+        self.index = PatientSimilarityIndex(self.df[self.features].to_numpy())
+        self._set_profiles(
+            ids=self.df['mrd_no'].to_numpy(),
+            features=self.df[self.features].to_numpy(dtype=np.float32),
+            mortality=self.df['mortality_flag'].to_numpy(dtype=np.float32)
+            if 'mortality_flag' in self.df.columns else np.full(len(self.df), np.nan, dtype=np.float32)
+        )
+        print("✅ Similarity index created.")
 
-    def recommend_similar_patients(self, mrd_no, top_n=5):
-        print(f"\n🔍 Fetching top {top_n} similar patients for MRD No: {mrd_no}...")
+    def _set_profiles(self, ids, features, mortality, sorted_ids=None, sorted_order=None):
+        if ids.dtype == object:
+            ids = ids.astype(str)
+        if sorted_order is None:
+            # Stable sort keeps the first row per MRD first, matching the previous lookup
+            sorted_order = np.argsort(ids, kind="stable")
+            sorted_ids = ids[sorted_order]
+        self.profile_ids, self.profile_features, self.profile_mortality = ids, features, mortality
+        self.sorted_ids, self.sorted_order = sorted_ids, sorted_order
+        self.delta_profiles = pd.DataFrame(columns=['mrd_no'] + self.features + ['mortality_flag'])
+        self.delta_lookup = {}
 
+    def _position(self, mrd_no):
+        if mrd_no in self.delta_lookup:
+            return self.delta_lookup[mrd_no]
         try:
-            idx = self.df[self.df['mrd_no'] == mrd_no].index[0]
-        except IndexError:
+            key = np.asarray(mrd_no, dtype=self.sorted_ids.dtype)
+        except (TypeError, ValueError):
+            return None
+        i = np.searchsorted(self.sorted_ids, key)
+        if i < len(self.sorted_ids) and self.sorted_ids[i] == key:
+            return int(self.sorted_order[i])
+        return None
+
+    def _profiles(self, positions):
+        n_main = len(self.profile_ids)
+        rows = []
+        for pos in positions:
+            if pos < n_main:
+                row = {'mrd_no': self.profile_ids[pos], 'mortality_flag': self.profile_mortality[pos]}
+                row.update(zip(self.features, self.profile_features[pos]))
+            else:
+                row = self.delta_profiles.iloc[pos - n_main].to_dict()
+            rows.append(row)
+        return pd.DataFrame(rows, columns=['mrd_no'] + self.features + ['mortality_flag'])
+
+    def recommend_similar_patients(self, mrd_no, top_n=5, exact=False):
+        print(f"\n🔍 Fetching top {top_n} similar patients for MRD No: {mrd_no}...")
+
+        idx = self._position(mrd_no)
+        if idx is None:
             print("❌ MRD not found in dataset.")
             return
 
-        sim_scores = list(enumerate(self.similarity_matrix[idx]))
-        sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-
-        # Exclude the patient itself
-        sim_scores = [score for score in sim_scores if score[0] != idx][:top_n]
+        # Ask for one extra neighbour, then exclude the patient itself
+        neighbours, scores = self.index.query(self.index.vector(idx), k=top_n + 1, exact=exact)
+        keep = neighbours != idx
+        neighbours, scores = neighbours[keep][:top_n], scores[keep][:top_n]
 
-        recommended = self.df.iloc[[i[0] for i in sim_scores]]
+        recommended = self._profiles(neighbours).assign(similarity=scores)
         print(recommended[['mrd_no', 'age', 'los', 'pollution_pm25', 'mortality_flag']])
         return recommended
 
-    def suggest_interventions(self, patient_row):
-        print(f"\n💡 Suggestions for MRD: {patient_row['mrd_no']}")
+    # ------------------------------
+    # Persistent index & online inserts
+    # ------------------------------
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def save_index(self):
+        """Persist scaler parameters, patient profiles and the similarity index."""
+        print(f"🔹 Saving recommender index to: {self.index_dir}")
+        self._merge_delta()
+        os.makedirs(self.index_dir, exist_ok=True)
+        scaler_state = {
+            'features': self.features,
+            'mean': self.scaler.mean_.tolist(),
+            'scale': self.scaler.scale_.tolist()
+        }
+        _atomic_save(self._path("scaler.json"), lambda f: f.write(json.dumps(scaler_state, indent=2).encode()))
+        for name, values in [('ids', self.profile_ids), ('features', self.profile_features),
+                             ('mortality', self.profile_mortality), ('sorted_ids', self.sorted_ids),
+                             ('sorted_order', self.sorted_order)]:
+            _atomic_save(self._path(f"{name}.npy"), lambda f, v=values: np.save(f, v))
+        self.index.save(self.index_dir)
+        with self._lock:
+            # Keep logging rows that arrived while the index was being written
+            if len(self.delta_profiles):
+                _atomic_save(self._path("delta.csv"), lambda f: self.delta_profiles.to_csv(f, index=False))
+            elif os.path.exists(self._path("delta.csv")):
+                os.remove(self._path("delta.csv"))
+        self.persistent = True
+
+    @classmethod
+    def from_index(cls, index_dir="recommender_index"):
+        """Open a saved index without reading or re-normalizing the corpus."""
+        recommender = cls(index_dir=index_dir)
+        with open(recommender._path("scaler.json")) as f:
+            scaler_state = json.load(f)
+        recommender.features = scaler_state['features']
+        recommender.scaler = StoredScaler(scaler_state['mean'], scaler_state['scale'])
+
+        load = lambda name: np.load(recommender._path(f"{name}.npy"), mmap_mode="r")
+        recommender._set_profiles(load('ids'), load('features'), load('mortality'),
+                                  load('sorted_ids'), load('sorted_order'))
+        recommender.index = PatientSimilarityIndex.load(index_dir)
+        recommender.persistent = True
+
+        # Replay same-day inserts that have not been compacted yet
+        if os.path.exists(recommender._path("delta.csv")):
+            recommender._insert_scaled(pd.read_csv(recommender._path("delta.csv")), log=False)
+        return recommender
+
+    def add_patients(self, patients):
+        """
+        Make new admissions searchable immediately.
 
-        suggestions = []
+        Rows carry the raw feature columns (gender as M/F) and `mrd_no`; they are
+        scaled with the stored scaler parameters, so the corpus is never
+        re-normalized. A background compaction starts once the delta segment
+        reaches `compact_threshold` rows.
+        """
+        rows = patients.copy(deep=False)
+        rows['gender'] = rows['gender'].map({'M': 0, 'F': 1}).astype(float)
+        rows[self.features] = self.scaler.transform(rows[self.features].to_numpy())
+        if 'mortality_flag' not in rows.columns:
+            rows['mortality_flag'] = np.nan
+        self._insert_scaled(rows[['mrd_no'] + self.features + ['mortality_flag']])
 
-        if patient_row['pollution_pm25'] > 1.5:
-            suggestions.append("Air purifier recommended / transfer to cleaner ward")
+        if len(self.index.delta) >= self.compact_threshold and (
+                self._compaction is None or not self._compaction.is_alive()):
+            self._compaction = threading.Thread(target=self.compact_index, daemon=True)
+            self._compaction.start()
 
-        if patient_row['los'] > 10:
-            suggestions.append("Flag for long-stay review and infection monitoring")
+    def _insert_scaled(self, rows, log=True):
+        with self._lock:
+            positions = self.index.add(rows[self.features].to_numpy(dtype=np.float32))
+            self.delta_profiles = pd.concat([self.delta_profiles, rows], ignore_index=True)
+            self.delta_lookup.update(zip(rows['mrd_no'], positions.tolist()))
+            if log and self.persistent:
+                # Append-only log, so inserts survive a restart before compaction
+                path = self._path("delta.csv")
+                rows.to_csv(path, mode="a", index=False, header=not os.path.exists(path))
 
-        if patient_row['age'] > 65:
-            suggestions.append("Geriatric support plan initiation")
+    def _merge_delta(self):
+        # One merge at a time; inserts keep landing in the delta while the tree is rebuilt
+        with self._merge_lock:
+            with self._lock:
+                n_delta = len(self.delta_profiles)
+                if not n_delta:
+                    return
+                merged = self.delta_profiles.iloc[:n_delta]
+            # Fold exactly the snapshotted rows, so the index and the profiles stay aligned
+            self.index.compact(n_delta)
+            with self._lock:
+                ids = np.concatenate([self.profile_ids, merged['mrd_no'].to_numpy().astype(self.profile_ids.dtype)])
+                features = np.vstack([self.profile_features, merged[self.features].to_numpy(dtype=np.float32)])
+                mortality = np.concatenate([self.profile_mortality,
+                                            merged['mortality_flag'].to_numpy(dtype=np.float32)])
+                remaining = self.delta_profiles.iloc[n_delta:]
+                self._set_profiles(ids, features, mortality)
+                n_main = len(ids)
+                self.delta_profiles = remaining.reset_index(drop=True)
+                self.delta_lookup = {mrd: n_main + i for i, mrd in enumerate(remaining['mrd_no'])}
 
-        if patient_row['mortality_flag'] == 1:
-            suggestions.append("Retrospective review for critical event prevention")
+    def compact_index(self):
+        """Fold online inserts into the main index and persist it (periodic/background job)."""
+        if self.persistent:
+            self.save_index()
+        else:
+            self._merge_delta()
 
-        if not suggestions:
-            suggestions.append("Maintain standard monitoring and care")
+    def to_raw_units(self, frame):
+        """Undo the standard scaling so rules compare against clinical units."""
+        raw = frame.copy(deep=False)
+        raw[self.features] = self.scaler.inverse_transform(frame[self.features].to_numpy(dtype=float))
+        return raw
 
-        for s in suggestions:
-            print(f"- {s}")
+    def cohort_profiles(self):
+        """All indexed patients (including online inserts) in raw units."""
+        frame = pd.DataFrame(np.asarray(self.profile_features), columns=self.features)
+        frame.insert(0, 'mrd_no', np.asarray(self.profile_ids))
+        frame['mortality_flag'] = np.asarray(self.profile_mortality)
+        if len(self.delta_profiles):
+            frame = pd.concat([frame, self.delta_profiles], ignore_index=True)
+        return self.to_raw_units(frame)
+
+    def intervention_table(self, patients=None):
+        """Sparse patient-to-suggestion table for `patients` (scaled profiles) or the whole cohort."""
+        raw = self.cohort_profiles() if patients is None else self.to_raw_units(patients)
+        return self.rule_engine.evaluate(raw)
+
+    def suggest_interventions(self, patient_row):
+        self.print_interventions(self.intervention_table(pd.DataFrame([patient_row])))
+
+    @staticmethod
+    def print_interventions(table):
+        for mrd_no, suggestions in table.groupby('mrd_no', sort=False)['suggestion']:
+            print(f"\n💡 Suggestions for MRD: {mrd_no}")
+            for s in suggestions:
+                print(f"- {s}")
+
+    def build_neighbour_table(self, top_n=5, output_path="patient_neighbours.csv", n_jobs=None):
+        """
+        Nightly batch job: top-N similar patients for every patient in the cohort.
+
+        Writes an (mrd_no, neighbour, score, rank) table block by block, so
+        neither the similarity scores nor the output are held in memory at once.
+        """
+        if self.index is None:
+            self.preprocess()
+            self.compute_similarity()
+        self._merge_delta()
+
+        print(f"🔹 Building top-{top_n} neighbour table for {len(self.index)} patients...")
+        mrd = self.profile_ids
+        ranks = np.arange(1, top_n + 1)
+        header = True
+        with open(output_path, "w", newline="") as f:
+            for start, idx, scores in self.index.iter_all_top_k(k=top_n, n_jobs=n_jobs):
+                block = pd.DataFrame({
+                    'mrd_no': np.repeat(mrd[start:start + len(idx)], idx.shape[1]),
+                    'neighbour': mrd[idx.ravel()],
+                    'score': scores.ravel().round(6),
+                    'rank': np.tile(ranks[:idx.shape[1]], len(idx))
+                })
+                block.to_csv(f, index=False, header=header)
+                header = False
+        print(f"✅ Neighbour table written to: {output_path}")
 
     def run_recommender_for_patient(self, mrd_no):
-        self.preprocess()
-        self.compute_similarity()
+        # Reuse the fitted index across calls
+        if self.index is None:
+            self.preprocess()
+            self.compute_similarity()
         similar_patients = self.recommend_similar_patients(mrd_no)
 
         if similar_patients is not None:
-            for _, row in similar_patients.iterrows():
-                self.suggest_interventions(row)
+            self.print_interventions(self.intervention_table(similar_patients))
 
 
 if __name__ == "__main__":
-    recommender = PatientRecommender("Data/master_hospital_data.csv")
+    from carepulse.paths import MASTER_DATA
+
+    enable_copy_on_write()
+    recommender = PatientRecommender(MASTER_DATA)
     recommender.run_recommender_for_patient(mrd_no=234882)  # Replace with actual MRD number
+    # Persisted for `python -m carepulse similar-patients`
+    recommender.save_index()
@@ -0,0 +1,8 @@
+"""
+CarePulse HDHI shared tooling.
+
+The numbered step scripts in this folder hold the analytics; this package
+holds the plumbing around them (warehouse loading, query running, pipeline
+orchestration). Submodules are imported on demand so that importing the
+package stays cheap.
+"""
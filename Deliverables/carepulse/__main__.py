@@ -0,0 +1,5 @@
+import sys
+
+from carepulse.cli import main
+
+sys.exit(main())
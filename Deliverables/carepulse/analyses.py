@@ -0,0 +1,237 @@
+"""
+Runner for the analytical query suite in `Business Analyses.sql`.
+
+Queries are split on their `-- Query N: Title` headers and executed in
+parallel over a small connection pool. Each run records wall time, row count
+and the `EXPLAIN` plan per query, and appends them to a JSON-lines history so
+queries that regress as the fact table grows can be spotted run over run.
+
+Results are cached by query text and data version (the latest load batch and
+pollution load, see `carepulse.warehouse`); a repeat dashboard query against
+unchanged data is served from memory or the on-disk cache without touching
+the database.
+
+PostgreSQL needs `psycopg2`. The embedded engine for local runs and tests is
+DuckDB, which runs the PostgreSQL dialect of the suite unchanged; it is fed
+from a `WarehouseLoader` database.
+"""
+import hashlib
+import json
+import os
+import pickle
+import queue
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+QUERY_HEADER = re.compile(r"^-- Query (\d+):\s*(.+)$", re.MULTILINE)
+
+DATA_VERSION_SQL = """SELECT
+    (SELECT COALESCE(MAX(batch_id), 0) FROM load_batches),
+    (SELECT COUNT(*) FROM fact_admissions),
+    (SELECT COALESCE(MAX(load_id), 0) FROM pollution_loads),
+    (SELECT COUNT(*) FROM dim_pollution),
+    (SELECT CAST(MAX(recorded_date) AS VARCHAR) FROM dim_pollution)"""
+
+# Tables copied from a WarehouseLoader database into the embedded engine
+EMBEDDED_TABLES = ['fact_admissions', 'dim_patient', 'dim_department', 'dim_pollution',
+                   'load_batches', 'pollution_loads', 'pollution_weekly_exposure',
+                   'pollution_monthly_exposure', 'monthly_admission_summary', 'department_summary']
+
+
+def load_queries(path="Business Analyses.sql"):
+    """Split the suite into a DataFrame of (query_id, title, sql)."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    headers = list(QUERY_HEADER.finditer(text))
+    queries = []
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        body = "\n".join(line for line in text[header.end():end].splitlines()
+                         if not line.lstrip().startswith("--"))
+        queries.append({
+            'query_id': int(header.group(1)),
+            'title': header.group(2).strip(),
+            'sql': body.strip().rstrip(";").strip()
+        })
+    return pd.DataFrame(queries)
+
+
+class AnalysisRunner:
+    def __init__(self, dsn=None, backend="postgres", pool_size=4, cache_dir=None,
+                 history_path=None, explain=True):
+        self.dsn = dsn
+        self.backend = backend
+        self.pool_size = pool_size
+        self.cache_dir = cache_dir
+        self.history_path = history_path
+        self.explain = explain
+        self.cache = {}
+        self.base = None
+        self.pool = queue.Queue()
+        for _ in range(pool_size):
+            self.pool.put(self._connect())
+
+    def _connect(self):
+        if self.backend == "duckdb":
+            import duckdb
+            if self.base is None:
+                self.base = duckdb.connect(self.dsn or ":memory:")
+            # Cursors are independent connections to the same database
+            return self.base.cursor()
+        import psycopg2
+        conn = psycopg2.connect(self.dsn)
+        # Analytics are read-only; skip transaction bookkeeping per query
+        conn.set_session(readonly=True, autocommit=True)
+        return conn
+
+    @classmethod
+    def embedded(cls, loader, tables=EMBEDDED_TABLES, **kwargs):
+        """In-process DuckDB copy of a WarehouseLoader database."""
+        runner = cls(backend="duckdb", **kwargs)
+        for table in tables:
+            frame = pd.read_sql(f"SELECT * FROM {table}", loader.conn)
+            for col in ['doa', 'dod', 'recorded_date', 'week_start', 'month_start', 'month']:
+                if col in frame.columns:
+                    frame[col] = pd.to_datetime(frame[col]).dt.date
+            if 'is_mortality_case' in frame.columns:
+                frame['is_mortality_case'] = frame['is_mortality_case'].astype(bool)
+            runner.base.register("frame_view", frame)
+            runner.base.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM frame_view")
+            runner.base.unregister("frame_view")
+        return runner
+
+    def close(self):
+        while not self.pool.empty():
+            self.pool.get().close()
+        if self.base is not None:
+            self.base.close()
+
+    def _fetch(self, conn, sql):
+        cur = conn.cursor() if self.backend == "postgres" else conn
+        cur.execute(sql)
+        columns = [d[0] for d in cur.description]
+        return pd.DataFrame(cur.fetchall(), columns=columns)
+
+    def data_version(self):
+        conn = self.pool.get()
+        try:
+            return ":".join(str(v) for v in self._fetch(conn, DATA_VERSION_SQL).iloc[0])
+        finally:
+            self.pool.put(conn)
+
+    def _cache_key(self, sql, version):
+        return hashlib.sha256(f"{version}\n{sql}".encode()).hexdigest()
+
+    def _cached(self, key):
+        if key in self.cache:
+            return self.cache[key]
+        if self.cache_dir:
+            path = os.path.join(self.cache_dir, f"{key}.pkl")
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    self.cache[key] = pickle.load(f)
+                return self.cache[key]
+        return None
+
+    def _store(self, key, result):
+        self.cache[key] = result
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = os.path.join(self.cache_dir, f"{key}.tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump(result, f)
+            os.replace(tmp, os.path.join(self.cache_dir, f"{key}.pkl"))
+
+    def run_query(self, sql, version=None, use_cache=True):
+        """Run one statement; returns (result DataFrame, stats dict)."""
+        version = version if version is not None else self.data_version()
+        key = self._cache_key(sql, version)
+        if use_cache:
+            cached = self._cached(key)
+            if cached is not None:
+                return cached, {'seconds': 0.0, 'rows': len(cached), 'cached': True, 'plan': None}
+
+        conn = self.pool.get()
+        try:
+            start = time.perf_counter()
+            result = self._fetch(conn, sql)
+            seconds = time.perf_counter() - start
+            plan = None
+            if self.explain:
+                plan = "\n".join(str(row[-1]) for row in self._fetch(conn, f"EXPLAIN {sql}").itertuples(index=False))
+        finally:
+            self.pool.put(conn)
+        self._store(key, result)
+        return result, {'seconds': round(seconds, 4), 'rows': len(result), 'cached': False, 'plan': plan}
+
+    def _run_one(self, query, version, use_cache):
+        try:
+            result, stats = self.run_query(query['sql'], version, use_cache)
+            stats['error'] = None
+        except Exception as exc:
+            result, stats = None, {'seconds': None, 'rows': None, 'cached': False, 'plan': None,
+                                   'error': f"{type(exc).__name__}: {exc}"}
+        return query['query_id'], result, stats
+
+    def run_suite(self, path="Business Analyses.sql", query_ids=None, use_cache=True):
+        """
+        Run the suite in parallel; returns (report DataFrame, {query_id: result}).
+        """
+        queries = load_queries(path)
+        if query_ids is not None:
+            queries = queries[queries['query_id'].isin(query_ids)]
+        version = self.data_version()
+        fact_rows = int(version.split(":")[1])
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.pool_size) as pool:
+            outcomes = list(pool.map(lambda q: self._run_one(q, version, use_cache),
+                                     queries.to_dict("records")))
+        total = round(time.perf_counter() - start, 3)
+
+        results = {qid: result for qid, result, _ in outcomes}
+        report = pd.DataFrame([{'query_id': qid, **stats} for qid, _, stats in outcomes])
+        report = queries[['query_id', 'title']].merge(report, on='query_id')
+        report['data_version'] = version
+        report['fact_rows'] = fact_rows
+        report['run_at'] = pd.Timestamp.now().isoformat(timespec="seconds")
+
+        failed = report['error'].notna().sum()
+        print(f"Ran {len(report)} queries in {total}s "
+              f"({int(report['cached'].sum())} from cache, {failed} failed) on {fact_rows} fact rows")
+        if self.history_path:
+            self._append_history(report)
+        return report, results
+
+    def _append_history(self, report):
+        with open(self.history_path, "a", encoding="utf-8") as f:
+            for record in report.drop(columns=['plan']).to_dict("records"):
+                f.write(json.dumps(record, default=str) + "\n")
+
+    def regressions(self, threshold=1.5):
+        """
+        Compare each query's latest uncached timing against its median over
+        earlier runs; rows above `threshold` times the median are returned.
+        """
+        history = pd.read_json(self.history_path, lines=True)
+        history = history[~history['cached'] & history['error'].isna()]
+        history = history.sort_values('run_at')
+        latest = history.groupby('query_id').tail(1)
+        earlier = history.drop(latest.index).groupby('query_id').agg(
+            median_seconds=('seconds', 'median'), baseline_rows=('fact_rows', 'median'))
+        compared = latest.set_index('query_id')[['title', 'seconds', 'fact_rows']].join(earlier, how='inner')
+        compared['slowdown'] = (compared['seconds'] / compared['median_seconds']).round(2)
+        compared['data_growth'] = (compared['fact_rows'] / compared['baseline_rows']).round(2)
+        return compared[compared['slowdown'] > threshold].sort_values('slowdown', ascending=False)
+
+
+if __name__ == "__main__":
+    from carepulse.warehouse import WarehouseLoader
+
+    loader = WarehouseLoader("carepulse_hdhi.db")
+    runner = AnalysisRunner.embedded(loader, cache_dir="query_cache", history_path="query_history.jsonl")
+    report, _ = runner.run_suite("Business Analyses.sql")
+    print(report[['query_id', 'title', 'seconds', 'rows', 'cached', 'error']].to_string(index=False))
@@ -0,0 +1,222 @@
+"""
+Benchmark suite for the CarePulse stages on synthetic HDHI data.
+
+For each scale, `carepulse.synthetic` writes the raw files once (cached by
+scale and seed), Step 0 builds the master dataset from them, and each stage
+then runs in its own child process so that peak RSS is per stage and a
+quadratic path can be cut off by a timeout without losing the other results.
+
+Every measurement is appended as one JSON line (scale, rows, stage, status,
+wall and CPU seconds, baseline and peak RSS, optional tracemalloc peak,
+commit) to `results_path`, so runs from different commits can be compared.
+A stage that raises is recorded as `failed` (its log tail goes to stderr)
+and the suite moves on; the stages of a scale whose Step 0 failed are
+recorded as `blocked`. The command exits non-zero when any stage failed.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from carepulse import paths
+from carepulse.instrument import _rss_mb
+from carepulse.schema import enable_copy_on_write, read_master
+from carepulse.synthetic import SCALES, generate_hdhi
+
+
+def _stat_tests(master):
+    df = read_master(master)
+    paths.load_step("Step 2 - Stats Tests.py").CarePulseStatTests(df).run_all_tests()
+    return len(df)
+
+
+def _modelling(master):
+    model = paths.load_step("Step 5 - Risk Flagging & Strategic Recommendations.py").CarePulseModeling(master)
+    model.run_full_pipeline()
+    return len(model.df)
+
+
+def _risk_engine(master):
+    engine = paths.load_step("Step 6 - Time Series Forecasting.py").CarePulseRiskEngine(master)
+    engine.run_all()
+    return len(engine.df)
+
+
+def _forecasting(master):
+    # Monthly aggregation plus the SARIMA / Prophet fits, without the plots
+    forecaster = paths.load_step("Step 7 - Risk Clustering.py").HospitalForecasting(master)
+    forecaster.preprocess()
+    forecaster.fit_forecast_states()
+    return len(forecaster.data)
+
+
+def _recommender(master):
+    # Features come from the master plus the synthetic pollution file (CAREPULSE_DATA_DIR)
+    step = paths.load_step("Step 8 - Patient Recommendation System.py")
+    recommender = step.PatientRecommender(master)
+    recommender.run_recommender_for_patient(mrd_no=recommender.raw_data['mrd_no'].iloc[0])
+    # The all-patients (n x n) path
+    recommender.build_neighbour_table(top_n=5)
+    return len(recommender.raw_data)
+
+
+# Stage name -> callable(master path) returning the row count it processed.
+# 'enrich' (Step 0) is a flat script and runs as one.
+STAGES = {
+    'enrich': None,
+    'stat_tests': _stat_tests,
+    'modelling': _modelling,
+    'risk_engine': _risk_engine,
+    'forecasting': _forecasting,
+    'recommender': _recommender,
+}
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=paths.STEP_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure_stage(stage, master, result_path, trace_memory=False):
+    """Child-process side: run one stage and write its measurements as JSON."""
+    enable_copy_on_write()
+    baseline_rss = _rss_mb()
+    if trace_memory:
+        tracemalloc.start()
+    wall, cpu = time.perf_counter(), time.process_time()
+    # An exception propagates: the child exits non-zero and the suite records the stage as failed
+    record = {'stage': stage, 'status': "ok", 'rows': None}
+    if stage == 'enrich':
+        import runpy
+        runpy.run_path(os.path.join(paths.STEP_DIR, "Step 0 - Data Validation & Enrichment.py"), run_name="__main__")
+        with open(master) as f:
+            record['rows'] = sum(1 for _ in f) - 1
+    else:
+        record['rows'] = STAGES[stage](master)
+    record.update({
+        'wall_s': round(time.perf_counter() - wall, 3),
+        'cpu_s': round(time.process_time() - cpu, 3),
+        'baseline_rss_mb': baseline_rss,
+        'peak_rss_mb': _rss_mb(),
+        'tracemalloc_peak_mb': round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1) if trace_memory else None,
+    })
+    with open(result_path, "w") as f:
+        json.dump(record, f)
+
+
+class BenchmarkSuite:
+    def __init__(self, scales=("10k", "1m", "10m"), stages=None, work_dir="bench_runs",
+                 results_path="bench_results.jsonl", seed=42, timeout=3600, trace_memory=False):
+        self.scales = scales
+        self.stages = list(stages or STAGES)
+        self.work_dir = os.path.abspath(work_dir)
+        self.results_path = results_path
+        self.seed = seed
+        self.timeout = timeout
+        self.trace_memory = trace_memory
+        self.commit = _commit()
+
+    def dataset(self, scale):
+        """Raw synthetic files for a scale, generated once per seed."""
+        data_dir = os.path.join(self.work_dir, f"{scale}-seed{self.seed}", "raw")
+        if not os.path.exists(os.path.join(data_dir, "HDHI Mortality Data.csv")):
+            print(f"Generating {scale} synthetic rows...")
+            generate_hdhi(SCALES.get(scale) or int(scale), data_dir, seed=self.seed)
+        return data_dir
+
+    def _run_stage(self, scale, stage, data_dir):
+        scale_dir = os.path.dirname(data_dir)
+        stage_dir = os.path.join(scale_dir, stage)
+        os.makedirs(stage_dir, exist_ok=True)
+        master = os.path.join(scale_dir, "master_hospital_data.csv")
+        result_path = os.path.join(stage_dir, "result.json")
+        if os.path.exists(result_path):
+            os.remove(result_path)
+
+        env = dict(os.environ, MPLBACKEND="Agg", CAREPULSE_DATA_DIR=data_dir,
+                   CAREPULSE_OUTPUT_DIR=scale_dir, CAREPULSE_MASTER_DATA=master,
+                   PYTHONPATH=os.pathsep.join(filter(None, [paths.STEP_DIR, os.environ.get("PYTHONPATH")])))
+        cmd = [sys.executable, "-m", "carepulse.bench", "--measure", stage, "--master", master,
+               "--result", result_path] + (["--trace-memory"] if self.trace_memory else [])
+        start = time.perf_counter()
+        log_path = os.path.join(stage_dir, "stage.log")
+        with open(log_path, "w") as log:
+            try:
+                finished = subprocess.run(cmd, cwd=stage_dir, env=env, stdout=log, stderr=subprocess.STDOUT,
+                                          timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                finished = None
+
+        if finished is None:
+            record = {'stage': stage, 'status': "timeout", 'wall_s': round(time.perf_counter() - start, 3)}
+        elif finished.returncode != 0 or not os.path.exists(result_path):
+            with open(log_path) as log:
+                lines = log.readlines()
+            print(f"[{scale}] stage '{stage}' failed (exit {finished.returncode}), see {log_path}:\n"
+                  + "".join(lines[-15:]), file=sys.stderr)
+            record = {'stage': stage, 'status': "failed", 'wall_s': round(time.perf_counter() - start, 3),
+                      'error': lines[-1].strip() if lines else None}
+        else:
+            with open(result_path) as f:
+                record = json.load(f)
+        return self._result(scale, record)
+
+    def _result(self, scale, record):
+        return {'scale': scale, 'commit': self.commit, 'python': platform.python_version(),
+                'run_at': time.strftime("%Y-%m-%dT%H:%M:%S"), **record}
+
+    def run(self):
+        """Run every stage at every scale; returns the results as a DataFrame."""
+        results = []
+        for scale in self.scales:
+            data_dir = self.dataset(scale)
+            # Step 0 first: every other stage reads the master dataset it writes
+            enriched = False
+            for stage in ['enrich'] + [s for s in self.stages if s != 'enrich']:
+                if stage == 'enrich' or enriched:
+                    record = self._run_stage(scale, stage, data_dir)
+                else:
+                    record = self._result(scale, {'stage': stage, 'status': "blocked"})
+                enriched = enriched or (stage == 'enrich' and record['status'] == "ok")
+                results.append(record)
+                print(f"[{scale}] {stage}: {record['status']} in {record.get('wall_s')}s, "
+                      f"peak RSS {record.get('peak_rss_mb')} MB")
+                with open(self.results_path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+        return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark CarePulse stages on synthetic data")
+    parser.add_argument("--scales", nargs="+", default=["10k", "1m", "10m"])
+    parser.add_argument("--stages", nargs="+", default=None, choices=list(STAGES))
+    parser.add_argument("--work-dir", default="bench_runs")
+    parser.add_argument("--results", default="bench_results.jsonl")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=int, default=3600)
+    parser.add_argument("--trace-memory", action="store_true", help="also record the tracemalloc peak (slower)")
+    # Child-process mode used by BenchmarkSuite
+    parser.add_argument("--measure", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--master", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--result", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure_stage(args.measure, args.master, args.result, trace_memory=args.trace_memory)
+    else:
+        suite = BenchmarkSuite(args.scales, args.stages, args.work_dir, args.results,
+                               seed=args.seed, timeout=args.timeout, trace_memory=args.trace_memory)
+        results = suite.run().reindex(columns=['scale', 'stage', 'status', 'rows', 'wall_s', 'cpu_s', 'peak_rss_mb'])
+        results['rows'] = results['rows'].astype("Int64")
+        print(results.to_string(index=False))
+        sys.exit(1 if results['status'].isin(["failed", "blocked"]).any() else 0)
@@ -0,0 +1,260 @@
+"""
+Single command-line entry point for the CarePulse steps.
+
+    python -m carepulse <command> [options]
+
+Every step of the pipeline is a subcommand (`enrich`, `eda`, `stats`,
+`modelling`, `explainability`, `risk-flagging`, `risk-engine`,
+`forecasting`, `risk-clustering`, `recommender`) that runs the step script
+as a program, so SHAP, LIME, Prophet, statsmodels, XGBoost and seaborn are
+only imported by the subcommand that uses them. `pipeline` runs the incremental DAG runner.
+
+Two lookups are meant for interactive use and skip the heavy stack:
+
+    score              risk segment of one admission from a saved cluster model
+    similar-patients   nearest patients and suggested interventions from a
+                       saved recommender index
+
+Both build and save their model on first use, and print JSON. `serve` keeps
+the models loaded behind a Unix socket; while it runs, `score` and
+`similar-patients` send their request to it instead of loading anything,
+unless `--no-daemon` is given.
+"""
+import argparse
+import contextlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+
+from carepulse import paths
+from carepulse.pipeline import STEPS
+
+CLUSTERING_SCRIPT = "Step 7 - Risk Clustering.py"
+RECOMMENDER_SCRIPT = "Step 8 - Patient Recommendation System.py"
+DEFAULT_SOCKET = os.environ.get("CAREPULSE_SOCKET", os.path.join(tempfile.gettempdir(), "carepulse.sock"))
+
+# Models held by this process (the daemon keeps them between requests)
+_models = {}
+
+
+def _jsonable(value):
+    # numpy scalars -> Python numbers; NaN becomes null. Rounding drops the
+    # float32 round-trip noise of unscaled features (+ 0.0 turns -0.0 into 0.0)
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float):
+        return None if value != value else round(value, 4) + 0.0
+    return value
+
+
+def _records(frame):
+    return [{col: _jsonable(v) for col, v in row.items()} for row in frame.to_dict(orient="records")]
+
+
+def _cluster_model(model_dir, data_path):
+    key = ('score', model_dir)
+    if key not in _models:
+        step = paths.load_step(CLUSTERING_SCRIPT)
+        if not os.path.exists(os.path.join(model_dir, "model.json")):
+            # Step output goes to stderr so stdout only carries the result
+            with contextlib.redirect_stdout(sys.stderr):
+                model = step.CarePulseRiskClustering(data_path)
+                model.fit()
+                os.makedirs(model_dir, exist_ok=True)
+                model.profile_clusters(os.path.join(model_dir, "patient_risk_clusters.csv"))
+                model.save_model(model_dir)
+        _models[key] = step.CarePulseRiskClustering.load_model(model_dir)
+    return _models[key]
+
+
+def _recommender(index_dir, data_path):
+    key = ('similar-patients', index_dir)
+    if key not in _models:
+        step = paths.load_step(RECOMMENDER_SCRIPT)
+        if not os.path.exists(os.path.join(index_dir, "scaler.json")):
+            with contextlib.redirect_stdout(sys.stderr):
+                recommender = step.PatientRecommender(data_path, index_dir=index_dir)
+                recommender.preprocess()
+                recommender.compute_similarity()
+                recommender.save_index()
+        _models[key] = step.PatientRecommender.from_index(index_dir)
+    return _models[key]
+
+
+def score(request):
+    model = _cluster_model(request['model_dir'], request['data'])
+    return {k: _jsonable(v) for k, v in model.score(request['patient']).items()}
+
+
+def similar_patients(request):
+    recommender = _recommender(request['index_dir'], request['data'])
+    with contextlib.redirect_stdout(sys.stderr):
+        # A one-off process scans the memory-mapped vectors; the daemon uses the tree
+        similar = recommender.recommend_similar_patients(request['mrd_no'], top_n=request['top'],
+                                                         exact=not request.get('warm', False))
+        if similar is None:
+            return {'mrd_no': request['mrd_no'], 'error': "MRD not found in index"}
+        interventions = recommender.intervention_table(similar)
+    raw = recommender.to_raw_units(similar)
+    return {
+        'mrd_no': request['mrd_no'],
+        'similar': _records(raw),
+        'interventions': _records(interventions[['mrd_no', 'rule_id', 'suggestion', 'priority']])
+    }
+
+
+HANDLERS = {'score': score, 'similar-patients': similar_patients}
+
+
+# ------------------------------
+# Warm daemon
+# ------------------------------
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            response = {'ok': True, 'result': HANDLERS[request['command']](dict(request, warm=True))}
+        except Exception as exc:
+            response = {'ok': False, 'error': f"{type(exc).__name__}: {exc}"}
+        self.wfile.write((json.dumps(response) + "\n").encode())
+
+
+def serve(socket_path=DEFAULT_SOCKET):
+    """
+    Answer score / similar-patients requests from one process with the
+    models kept loaded. Requests are handled one at a time.
+    """
+    from carepulse.schema import enable_copy_on_write
+
+    enable_copy_on_write()
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    with socketserver.UnixStreamServer(socket_path, _RequestHandler) as server:
+        print(f"CarePulse daemon listening on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
+
+
+def _ask_daemon(socket_path, request):
+    """Send a request to a running daemon; None when there is none to ask."""
+    if not os.path.exists(socket_path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.connect(socket_path)
+            conn.sendall((json.dumps(request) + "\n").encode())
+            with conn.makefile("rb") as reply:
+                return json.loads(reply.readline())
+    except OSError:
+        # Stale socket file from a daemon that is gone
+        return None
+
+
+# ------------------------------
+# Command line
+# ------------------------------
+def _patient_values(pairs, raw_json):
+    patient = json.loads(raw_json) if raw_json else {}
+    for pair in pairs:
+        name, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Expected feature=value, got '{pair}'")
+        patient[name] = float(value)
+    return patient
+
+
+def _lookup(args, request):
+    request = dict(request, command=args.command, data=os.path.abspath(args.data))
+    response = None if args.no_daemon else _ask_daemon(args.socket, request)
+    if response is None:
+        # Answered in this process, which loads the step classes
+        from carepulse.schema import enable_copy_on_write
+
+        enable_copy_on_write()
+        result = HANDLERS[args.command](request)
+    elif response['ok']:
+        result = response['result']
+    else:
+        print(response['error'], file=sys.stderr)
+        return 1
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+def _run_step(name, extra_args=()):
+    import runpy
+
+    script = os.path.join(paths.STEP_DIR, STEPS[name]['script'])
+    sys.argv = [script] + STEPS[name].get('args', []) + list(extra_args)
+    runpy.run_path(script, run_name="__main__")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="carepulse", description="CarePulse HDHI analytics steps")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name, step in STEPS.items():
+        # Further arguments go to the script, e.g. forecasting --update new_admissions.csv
+        commands.add_parser(name.replace("_", "-"), help=f"run {step['script']}")
+
+    pipeline = commands.add_parser("pipeline", help="run steps incrementally (carepulse.pipeline)")
+    pipeline.add_argument("steps", nargs="*")
+    pipeline.add_argument("--run-dir", default="pipeline_runs")
+    pipeline.add_argument("--jobs", type=int, default=None)
+    pipeline.add_argument("--force", action="store_true")
+
+    lookups = argparse.ArgumentParser(add_help=False)
+    lookups.add_argument("--data", default=paths.MASTER_DATA, help="master dataset used when building the model")
+    lookups.add_argument("--socket", default=DEFAULT_SOCKET)
+    lookups.add_argument("--no-daemon", action="store_true", help="always answer in this process")
+
+    scoring = commands.add_parser("score", parents=[lookups],
+                                  help="risk segment of one admission, e.g. score age=67 hb=9.1 ckd=1")
+    scoring.add_argument("values", nargs="*", metavar="feature=value")
+    scoring.add_argument("--json", default=None, help="patient values as a JSON object")
+    scoring.add_argument("--model-dir", default="risk_cluster_model")
+
+    similar = commands.add_parser("similar-patients", parents=[lookups],
+                                  help="nearest patients and interventions for an MRD number")
+    similar.add_argument("mrd_no")
+    similar.add_argument("--top", type=int, default=5)
+    similar.add_argument("--index-dir", default="recommender_index")
+
+    daemon = commands.add_parser("serve", help="keep models loaded and answer score / similar-patients")
+    daemon.add_argument("--socket", default=DEFAULT_SOCKET)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, step_args = parser.parse_known_args(argv)
+    if step_args and args.command.replace("-", "_") not in STEPS:
+        parser.error(f"unrecognized arguments: {' '.join(step_args)}")
+
+    if args.command == "score":
+        try:
+            patient = _patient_values(args.values, args.json)
+        except ValueError as exc:
+            print(exc, file=sys.stderr)
+            return 2
+        return _lookup(args, {'patient': patient, 'model_dir': os.path.abspath(args.model_dir)})
+    if args.command == "similar-patients":
+        mrd_no = int(args.mrd_no) if args.mrd_no.isdigit() else args.mrd_no
+        return _lookup(args, {'mrd_no': mrd_no, 'top': args.top, 'index_dir': os.path.abspath(args.index_dir)})
+    if args.command == "serve":
+        serve(args.socket)
+        return 0
+    if args.command == "pipeline":
+        from carepulse.pipeline import Pipeline
+
+        results = Pipeline(run_dir=args.run_dir, max_workers=args.jobs).run(args.steps or None, force=args.force)
+        return 1 if any(s in ("failed", "blocked") for s in results.values()) else 0
+    return _run_step(args.command.replace("-", "_"), step_args)
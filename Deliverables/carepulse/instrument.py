@@ -0,0 +1,191 @@
+"""
+Lightweight per-method instrumentation for the step classes.
+
+`@instrumented` wraps every public method of a class. While instrumentation
+is disabled a wrapped call costs one flag check. When enabled, each call
+appends one JSON line with wall and CPU time, process peak RSS (and how much
+the call raised it), row count, status and its parent call. Entry points such
+as `run_all` therefore show up with their sub-steps nested under them.
+
+Enable it with environment variables (the pipeline runner sets the first):
+
+    CAREPULSE_METRICS=metrics.jsonl   write records to this file
+    CAREPULSE_TRACEMALLOC=1           also record the tracemalloc peak (slower)
+    CAREPULSE_PROFILE=1               sample stacks of top-level calls and write
+                                      folded stacks to <metrics>.folded
+
+or call `enable(...)` from Python.
+"""
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+import pandas as pd
+
+_config = {'log_path': None, 'trace_memory': False, 'profile': False, 'interval': 0.005}
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def enable(log_path="carepulse_metrics.jsonl", trace_memory=False, profile=False, interval=0.005):
+    _config.update(log_path=log_path, trace_memory=trace_memory, profile=profile, interval=interval)
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    _config['log_path'] = None
+
+
+def enabled():
+    return _config['log_path'] is not None
+
+
+def _rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+
+
+def _rows(instance, result):
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return len(result)
+    for attr in ('df', 'data', 'raw_data'):
+        value = getattr(instance, attr, None)
+        if isinstance(value, pd.DataFrame):
+            return len(value)
+    return None
+
+
+def _write(record):
+    with _write_lock, open(_config['log_path'], "a") as f:
+        f.write(json.dumps(record, default=str) + "\n")
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval into folded-stack counts."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.stacks
+
+    @staticmethod
+    def top_functions(stacks, n=15):
+        own = Counter()
+        for stack, count in stacks.items():
+            own[stack.rsplit(";", 1)[-1]] += count
+        total = sum(own.values()) or 1
+        return [{'function': name, 'share': round(count / total, 3)} for name, count in own.most_common(n)]
+
+
+def _call(method, name, instance, args, kwargs):
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    parent = stack[-1] if stack else None
+    frame = {'name': name, 'tm_peak': 0}
+    trace = _config['trace_memory'] and tracemalloc.is_tracing()
+    if trace:
+        current, peak = tracemalloc.get_traced_memory()
+        if parent is not None:
+            parent['tm_peak'] = max(parent['tm_peak'], peak)
+        frame['tm_peak'] = current
+        tracemalloc.reset_peak()
+    sampler = None
+    if _config['profile'] and parent is None:
+        sampler = StackSampler(threading.get_ident(), _config['interval'])
+        sampler.start()
+
+    stack.append(frame)
+    rss_before = _rss_mb()
+    wall, cpu = time.perf_counter(), time.process_time()
+    status, error, result = "ok", None, None
+    try:
+        result = method(instance, *args, **kwargs)
+        return result
+    except BaseException as exc:
+        status, error = "error", f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        record = {
+            'ts': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'pid': os.getpid(),
+            'name': name,
+            'parent': parent['name'] if parent else None,
+            'depth': len(stack) - 1,
+            'status': status,
+            'error': error,
+            'wall_s': round(time.perf_counter() - wall, 4),
+            'cpu_s': round(time.process_time() - cpu, 4),
+            'rss_peak_mb': _rss_mb(),
+            'rss_growth_mb': round(_rss_mb() - rss_before, 1),
+            'rows': _rows(instance, result),
+        }
+        stack.pop()
+        if trace:
+            peak = max(frame['tm_peak'], tracemalloc.get_traced_memory()[1])
+            record['tracemalloc_peak_mb'] = round(peak / 2 ** 20, 1)
+            if parent is not None:
+                parent['tm_peak'] = max(parent['tm_peak'], peak)
+        if sampler is not None:
+            stacks = sampler.stop()
+            record['profile_top'] = StackSampler.top_functions(stacks)
+            with _write_lock, open(_config['log_path'] + ".folded", "a") as f:
+                f.writelines(f"{stack_line} {count}\n" for stack_line, count in stacks.items())
+        _write(record)
+
+
+def _wrap(method, name):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if _config['log_path'] is None:
+            return method(self, *args, **kwargs)
+        return _call(method, name, self, args, kwargs)
+    return wrapper
+
+
+def instrumented(cls=None, *, exclude=()):
+    """
+    Class decorator: record every public method call when instrumentation is
+    enabled. Per-patient hot paths can be left out with `exclude`.
+    """
+    def decorate(cls):
+        for attr, method in list(vars(cls).items()):
+            if (attr.startswith("_") or attr in exclude or not callable(method)
+                    or isinstance(method, (staticmethod, classmethod, type))):
+                continue
+            setattr(cls, attr, _wrap(method, f"{cls.__name__}.{attr}"))
+        return cls
+    return decorate(cls) if cls is not None else decorate
+
+
+if os.environ.get("CAREPULSE_METRICS"):
+    enable(os.environ["CAREPULSE_METRICS"],
+           trace_memory=os.environ.get("CAREPULSE_TRACEMALLOC") == "1",
+           profile=os.environ.get("CAREPULSE_PROFILE") == "1",
+           interval=float(os.environ.get("CAREPULSE_PROFILE_INTERVAL", 0.005)))
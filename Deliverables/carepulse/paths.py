@@ -0,0 +1,35 @@
+"""
+Data locations shared by the step scripts.
+
+Defaults follow the repository layout (`Data/` for the raw HDHI files,
+`Data/Outputs/` for derived datasets) and can be overridden with the
+`CAREPULSE_DATA_DIR`, `CAREPULSE_OUTPUT_DIR` and `CAREPULSE_MASTER_DATA`
+environment variables, which is how the pipeline runner points every step
+at the same files.
+"""
+import importlib.util
+import os
+
+STEP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(STEP_DIR)
+
+DATA_DIR = os.environ.get("CAREPULSE_DATA_DIR", os.path.join(REPO_DIR, "Data"))
+OUTPUT_DIR = os.environ.get("CAREPULSE_OUTPUT_DIR", os.path.join(DATA_DIR, "Outputs"))
+MASTER_DATA = os.environ.get("CAREPULSE_MASTER_DATA", os.path.join(OUTPUT_DIR, "master_hospital_data.csv"))
+QUARANTINE_DATA = os.path.join(OUTPUT_DIR, "quarantined_admissions.csv")
+VALIDATION_REPORT = os.path.join(OUTPUT_DIR, "validation_report.csv")
+
+ADMISSION_DATA = os.path.join(DATA_DIR, "HDHI Admission data.csv")
+MORTALITY_DATA = os.path.join(DATA_DIR, "HDHI Mortality Data.csv")
+POLLUTION_DATA = os.path.join(DATA_DIR, "HDHI Pollution Data.csv")
+TABLE_HEADINGS = os.path.join(DATA_DIR, "table_headings.csv")
+
+
+def load_step(filename):
+    """Import a step script (the file names contain spaces) as a module."""
+    path = os.path.join(STEP_DIR, filename)
+    name = "carepulse_step_" + filename.split(" - ")[0].replace(" ", "_").lower()
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,258 @@
+"""
+Incremental runner for the CarePulse step scripts.
+
+Steps 0-8 are declared as a DAG of scripts with the files they read, the code
+they depend on and the files they write. A step is skipped when the hash of
+its inputs and the hash of its code (its script, extra modules and the shared
+`SHARED_CODE`) match the last successful run and its outputs still exist, so
+an unchanged nightly rerun only stats files.
+
+Everything downstream of Step 0 reads the master dataset only, so the
+branches (EDA, stats, modelling, forecasting, clustering, recommender) run
+concurrently, each as its own Python process in its own working directory
+under `run_dir`. Step stdout/stderr goes to `run_dir/logs/<step>.log` and the
+per-method timings from `carepulse.instrument` to `run_dir/logs/<step>.metrics.jsonl`.
+"""
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from carepulse import paths
+
+MODELLING_SCRIPT = "Step 5 - Risk Flagging & Strategic Recommendations.py"
+# Package modules every step imports; they are part of every step's code hash
+SHARED_CODE = ["carepulse/paths.py", "carepulse/schema.py", "carepulse/instrument.py"]
+
+# name -> script (and its arguments), inputs, outputs (relative outputs live in the
+# step's working dir), extra code files and upstream steps
+STEPS = {
+    'enrich': {
+        'script': "Step 0 - Data Validation & Enrichment.py",
+        'code': ["carepulse/validation.py", "carepulse/readmission.py"],
+        'inputs': [paths.ADMISSION_DATA, paths.MORTALITY_DATA, paths.POLLUTION_DATA, paths.TABLE_HEADINGS],
+        'outputs': [paths.MASTER_DATA, paths.QUARANTINE_DATA, paths.VALIDATION_REPORT],
+        'depends': []
+    },
+    'eda': {
+        'script': "Step 1 - EDA.py",
+        'inputs': [paths.MASTER_DATA],
+        'outputs': [],
+        'depends': ['enrich']
+    },
+    'stats': {
+        'script': "Step 2 - Stats Tests.py",
+        'inputs': [paths.MASTER_DATA],
+        'outputs': [],
+        'depends': ['enrich']
+    },
+    'modelling': {
+        'script': "Step 3 - Modelling.py",
+        'code': [MODELLING_SCRIPT],
+        'inputs': [paths.MASTER_DATA],
+        'outputs': ["predicted_outcomes.csv", "shap_summary_mortality.png", "shap_summary_los.png"],
+        'depends': ['enrich']
+    },
+    'explainability': {
+        'script': "Step 4 - Model Explainability.py",
+        'code': [MODELLING_SCRIPT],
+        'inputs': [paths.MASTER_DATA],
+        'outputs': ["predicted_outcomes.csv", "shap_summary_mortality.png", "shap_summary_los.png"],
+        'depends': ['enrich']
+    },
+    'risk_flagging': {
+        'script': MODELLING_SCRIPT,
+        'inputs': [paths.MASTER_DATA],
+        'outputs': ["predicted_outcomes.csv"],
+        'depends': ['enrich']
+    },
+    'risk_engine': {
+        'script': "Step 6 - Time Series Forecasting.py",
+        'inputs': [paths.MASTER_DATA],
+        'outputs': [],
+        'depends': ['enrich']
+    },
+    # Reruns find the saved forecast_state in the step's working dir and refresh it instead of refitting
+    'forecasting': {
+        'script': "Step 7 - Risk Clustering.py",
+        'args': ["forecast"],
+        'inputs': [paths.MASTER_DATA],
+        'outputs': ["forecast_state"],
+        'depends': ['enrich']
+    },
+    'risk_clustering': {
+        'script': "Step 7 - Risk Clustering.py",
+        'args': ["clusters"],
+        'inputs': [paths.MASTER_DATA, paths.POLLUTION_DATA],
+        'outputs': ["patient_risk_clusters.csv", "risk_cluster_model"],
+        'depends': ['enrich']
+    },
+    'recommender': {
+        'script': "Step 8 - Patient Recommendation System.py",
+        'inputs': [paths.MASTER_DATA, paths.POLLUTION_DATA],
+        'outputs': ["recommender_index"],
+        'depends': ['enrich']
+    },
+}
+
+
+class Pipeline:
+    def __init__(self, steps=STEPS, run_dir="pipeline_runs", max_workers=None):
+        self.steps = steps
+        self.run_dir = os.path.abspath(run_dir)
+        self.max_workers = max_workers or os.cpu_count()
+        self.state_path = os.path.join(self.run_dir, "pipeline_state.json")
+        self.state = {'steps': {}, 'file_hashes': {}}
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                self.state = json.load(f)
+        self._check_graph()
+
+    def _check_graph(self):
+        seen, visiting = set(), set()
+
+        def visit(name):
+            if name in seen:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline cycle through step '{name}'")
+            visiting.add(name)
+            for dep in self.steps[name]['depends']:
+                if dep not in self.steps:
+                    raise ValueError(f"Step '{name}' depends on unknown step '{dep}'")
+                visit(dep)
+            visiting.discard(name)
+            seen.add(name)
+
+        for name in self.steps:
+            visit(name)
+
+    def _step_dir(self, name):
+        return os.path.join(self.run_dir, name)
+
+    def _file_hash(self, path):
+        """Content hash, reused while size and mtime are unchanged."""
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        cached = self.state['file_hashes'].get(path)
+        if cached and cached['signature'] == signature:
+            return cached['sha256']
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self.state['file_hashes'][path] = {'signature': signature, 'sha256': digest.hexdigest()}
+        return digest.hexdigest()
+
+    def _hash_files(self, files):
+        digest = hashlib.sha256()
+        for path in files:
+            digest.update(path.encode())
+            digest.update((self._file_hash(path) if os.path.exists(path) else "missing").encode())
+        return digest.hexdigest()
+
+    def _outputs(self, name):
+        return [out if os.path.isabs(out) else os.path.join(self._step_dir(name), out)
+                for out in self.steps[name]['outputs']]
+
+    def fingerprint(self, name):
+        step = self.steps[name]
+        code = [os.path.join(paths.STEP_DIR, f) for f in [step['script']] + step.get('code', []) + SHARED_CODE]
+        return {'input_hash': self._hash_files(step['inputs']), 'code_hash': self._hash_files(code)}
+
+    def is_current(self, name, fingerprint):
+        previous = self.state['steps'].get(name)
+        return (previous is not None and previous['status'] == "ok"
+                and previous['input_hash'] == fingerprint['input_hash']
+                and previous['code_hash'] == fingerprint['code_hash']
+                and all(os.path.exists(out) for out in self._outputs(name)))
+
+    def _run_step(self, name):
+        step_dir = self._step_dir(name)
+        os.makedirs(step_dir, exist_ok=True)
+        metrics = os.path.join(self.run_dir, "logs", f"{name}.metrics.jsonl")
+        for path in (metrics, metrics + ".folded"):
+            if os.path.exists(path):
+                os.remove(path)
+        env = dict(os.environ, MPLBACKEND="Agg",
+                   CAREPULSE_DATA_DIR=paths.DATA_DIR, CAREPULSE_OUTPUT_DIR=paths.OUTPUT_DIR,
+                   CAREPULSE_MASTER_DATA=paths.MASTER_DATA,
+                   CAREPULSE_METRICS=metrics,
+                   PYTHONPATH=os.pathsep.join(filter(None, [paths.STEP_DIR, os.environ.get("PYTHONPATH")])))
+        start = time.perf_counter()
+        with open(os.path.join(self.run_dir, "logs", f"{name}.log"), "w") as log:
+            command = [sys.executable, os.path.join(paths.STEP_DIR, self.steps[name]['script'])]
+            result = subprocess.run(command + self.steps[name].get('args', []),
+                                    cwd=step_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        return result.returncode, round(time.perf_counter() - start, 2)
+
+    def _save_state(self):
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def run(self, targets=None, force=False):
+        """
+        Run `targets` (default: every step) and their upstream steps.
+        Returns {step: 'ok' | 'skipped' | 'failed' | 'blocked'}.
+        """
+        os.makedirs(os.path.join(self.run_dir, "logs"), exist_ok=True)
+        wanted, stack = set(), list(targets or self.steps)
+        while stack:
+            name = stack.pop()
+            if name not in wanted:
+                wanted.add(name)
+                stack.extend(self.steps[name]['depends'])
+
+        status, running = {}, {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while len(status) < len(wanted):
+                for name in sorted(wanted - set(status) - set(running)):
+                    deps = [status.get(dep) for dep in self.steps[name]['depends']]
+                    if any(d in ("failed", "blocked") for d in deps):
+                        status[name] = "blocked"
+                        print(f"[{name}] blocked by a failed upstream step")
+                        continue
+                    if not all(d in ("ok", "skipped") for d in deps):
+                        continue
+                    # Inputs are only hashed once upstream steps have written them
+                    fingerprint = self.fingerprint(name)
+                    if not force and self.is_current(name, fingerprint):
+                        status[name] = "skipped"
+                        print(f"[{name}] unchanged, skipped")
+                        continue
+                    print(f"[{name}] running {self.steps[name]['script']}")
+                    running[name] = (pool.submit(self._run_step, name), fingerprint)
+
+                if not running:
+                    continue
+                done, _ = wait([future for future, _ in running.values()], return_when=FIRST_COMPLETED)
+                for name in [n for n, (future, _) in running.items() if future in done]:
+                    future, fingerprint = running.pop(name)
+                    returncode, seconds = future.result()
+                    status[name] = "ok" if returncode == 0 else "failed"
+                    self.state['steps'][name] = {**fingerprint, 'status': status[name], 'seconds': seconds,
+                                                 'finished_at': time.strftime("%Y-%m-%dT%H:%M:%S")}
+                    print(f"[{name}] {status[name]} in {seconds}s"
+                          + ("" if returncode == 0 else f" (see logs/{name}.log)"))
+                    self._save_state()
+        self._save_state()
+        return status
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the CarePulse step scripts incrementally")
+    parser.add_argument("steps", nargs="*", help=f"steps to run (default: all of {', '.join(STEPS)})")
+    parser.add_argument("--run-dir", default="pipeline_runs")
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="rerun steps even when unchanged")
+    args = parser.parse_args()
+
+    results = Pipeline(run_dir=args.run_dir, max_workers=args.jobs).run(args.steps or None, force=args.force)
+    sys.exit(1 if any(s in ("failed", "blocked") for s in results.values()) else 0)
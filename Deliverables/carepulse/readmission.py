@@ -0,0 +1,74 @@
+"""
+Readmission episodes for the master dataset.
+
+Admissions are sorted once by (`mrd_no`, admission date). After that every
+patient's stays are contiguous, so "the previous admission of the same
+patient" is simply the previous row whenever the MRD number repeats. Every
+column below is a shift or a running index over the sorted arrays, with no
+groupby, window query or per-patient loop:
+
+    admission_seq               1 for a patient's first admission, 2 for the next, ...
+    days_since_last_discharge   doa minus the previous admission's dod (NaN for a first admission)
+    readmit_7d / _30d / _90d    1 when that gap is at most 7 / 30 / 90 days
+
+The gap follows `doa - LAG(dod) OVER (PARTITION BY mrd_no ORDER BY doa)` in
+Business Analyses.sql (Query 2), so an admission that starts before the
+previous discharge (a transfer) has a negative gap and counts as a readmission.
+Rows without an MRD number or a parseable admission date cannot be placed in
+an episode: they get admission_seq 0, no gap and no flags.
+"""
+import numpy as np
+import pandas as pd
+
+from carepulse.schema import parse_admission_dates
+
+READMISSION_WINDOWS = (7, 30, 90)
+READMISSION_COLUMNS = (['admission_seq', 'days_since_last_discharge']
+                       + [f"readmit_{days}d" for days in READMISSION_WINDOWS])
+
+
+def readmission_features(df, id_col='mrd_no', admit_col='doa', discharge_col='dod', windows=READMISSION_WINDOWS):
+    """Readmission columns for `df`, aligned with its index."""
+    # Dates written either way round resolve against month_year / length of stay
+    admit, discharge = parse_admission_dates(df, admit_col, discharge_col)
+    admit, discharge = admit.to_numpy(dtype="datetime64[D]"), discharge.to_numpy(dtype="datetime64[D]")
+    ids = df[id_col]
+    valid = ids.notna().to_numpy() & ~np.isnat(admit)
+
+    # One sort; codes make mixed int/str MRD numbers comparable
+    codes = pd.factorize(ids.astype("str"))[0]
+    rows = np.flatnonzero(valid)
+    rows = rows[np.lexsort((admit[rows], codes[rows]))]
+
+    patient = codes[rows]
+    same_patient = np.zeros(len(rows), dtype=bool)
+    same_patient[1:] = patient[1:] == patient[:-1]
+
+    # Sequence number = position minus the position where this patient's run starts
+    position = np.arange(len(rows))
+    run_start = np.maximum.accumulate(np.where(same_patient, 0, position))
+    seq = position - run_start + 1
+
+    previous_discharge = np.empty(len(rows), dtype="datetime64[D]")
+    previous_discharge[1:] = discharge[rows][:-1]
+    previous_discharge[~same_patient] = np.datetime64("NaT")
+    gap = (admit[rows] - previous_discharge).astype("float64")
+    gap[np.isnat(previous_discharge)] = np.nan
+
+    n = len(df)
+    features = {'admission_seq': np.zeros(n, dtype=np.int16),
+                'days_since_last_discharge': np.full(n, np.nan, dtype=np.float32)}
+    features['admission_seq'][rows] = seq
+    features['days_since_last_discharge'][rows] = gap
+    with np.errstate(invalid='ignore'):
+        for days in windows:
+            flag = np.zeros(n, dtype=np.int8)
+            flag[rows] = gap <= days
+            features[f"readmit_{days}d"] = flag
+    return pd.DataFrame(features, index=df.index)
+
+
+def add_readmission_features(df, **kwargs):
+    """`df` with the readmission columns added (replacing any earlier ones)."""
+    features = readmission_features(df, **kwargs)
+    return df.drop(columns=features.columns, errors='ignore').join(features)
@@ -0,0 +1,195 @@
+"""
+Compact in-memory schema for the master hospital dataset.
+
+Read with default dtypes, the master frame holds 0/1 comorbidity flags as
+int64, short codes such as gender and outcome as Python strings, and lab
+values as strings because of `EMPTY` markers. `read_master` parses straight
+into compact dtypes instead: int8 flags, categoricals for low-cardinality
+codes, float32 labs and int16/int32 counts. Columns outside the schema keep
+their default dtype.
+
+The step classes take shallow copies of the frames they are given, which
+relies on copy-on-write (the default from pandas 3): a column is only
+duplicated when a class actually modifies it. Importing this module (or a
+step) does not change pandas options; the entry points call
+`enable_copy_on_write` once: the step scripts' `__main__` blocks, the CLI and
+the benchmark child process.
+"""
+import numpy as np
+import pandas as pd
+
+FLAG_COLUMNS = [
+    'smoking', 'alcohol', 'dm', 'htn', 'cad', 'prior_cmp', 'ckd', 'raised_cardiac_enzymes',
+    'severe_anaemia', 'anaemia', 'stable_angina', 'acs', 'stemi', 'atypical_chest_pain',
+    'heart_failure', 'hfref', 'hfnef', 'valvular', 'chb', 'sss', 'aki', 'cva_infract', 'cva_bleed',
+    'af', 'vt', 'psvt', 'congenital', 'uti', 'neuro_cardiogenic_syncope', 'orthostatic',
+    'infective_endocarditis', 'dvt', 'cardiogenic_shock', 'shock', 'pulmonary_embolism',
+    'chest_infection', 'mortality_flag', 'readmit_7d', 'readmit_30d', 'readmit_90d'
+]
+CATEGORY_COLUMNS = ['gender', 'rural', 'type_of_admissionemergencyopd', 'outcome', 'month_year', 'age_bucket']
+LAB_COLUMNS = ['hb', 'tlc', 'platelets', 'glucose', 'urea', 'creatinine', 'bnp', 'ef']
+FLOAT_COLUMNS = LAB_COLUMNS + ['days_since_last_discharge']
+INT_COLUMNS = {'sno': 'int32', 'age': 'int16', 'duration_of_stay': 'int16', 'duration_of_intensive_unit_stay': 'int16',
+               'admission_seq': 'int16'}
+
+# Placeholders the source system writes for a missing value
+MISSING_MARKERS = ['EMPTY', '\\']
+# Outcomes that count as an in-hospital death (the HDHI extract writes EXPIRY)
+DEATH_OUTCOMES = ['DEATH', 'EXPIRY']
+# Daily averages of HDHI Pollution Data.csv, by the names the steps use
+POLLUTION_COLUMNS = {'AQI': 'aqi', 'PM2.5 AVG': 'pm25', 'PM10 AVG': 'pm10', 'NO2 AVG': 'no2',
+                     'SO2 AVG': 'so2', 'OZONE AVG': 'o3'}
+
+
+def enable_copy_on_write():
+    """Switch on pandas copy-on-write, which pandas 2 leaves off (process-wide)."""
+    if int(pd.__version__.split(".")[0]) == 2:
+        pd.set_option("mode.copy_on_write", True)
+
+
+def read_dtypes():
+    """
+    dtype mapping for pd.read_csv. Flags parse as float32 (a missing marker
+    becomes NaN) until `compact` narrows them; nullable Int8 parses ~4x slower.
+    """
+    dtypes = {col: 'float32' for col in FLAG_COLUMNS}
+    dtypes.update({col: 'category' for col in CATEGORY_COLUMNS})
+    dtypes.update({col: 'float32' for col in FLOAT_COLUMNS})
+    return dtypes
+
+
+def compact(df):
+    """Convert the schema columns present in `df` to their compact dtypes."""
+    converted = {}
+    for col in df.columns.intersection(FLAG_COLUMNS):
+        if df[col].dtype != 'int8':
+            # An unreadable flag counts as not recorded (0), as in the source
+            converted[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('int8')
+    for col in df.columns.intersection(CATEGORY_COLUMNS):
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            converted[col] = df[col].astype('category')
+    for col in df.columns.intersection(FLOAT_COLUMNS):
+        if df[col].dtype != 'float32':
+            converted[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+    for col in df.columns.intersection(list(INT_COLUMNS)):
+        values = pd.to_numeric(df[col], errors='coerce')
+        converted[col] = values.astype(INT_COLUMNS[col] if values.notna().all() else 'float32')
+    if not converted:
+        return df
+    return df.assign(**converted)
+
+
+def read_master(path, chunksize=None, **kwargs):
+    """
+    Load the master dataset in compact dtypes. With `chunksize`, returns an
+    iterator of compacted chunks.
+    """
+    options = dict(dtype=read_dtypes(), na_values=MISSING_MARKERS)
+    options.update(kwargs)
+    if chunksize:
+        return (compact(chunk) for chunk in pd.read_csv(path, chunksize=chunksize, **options))
+    return compact(pd.read_csv(path, **options))
+
+
+def parse_hdhi_dates(values, near=None):
+    """
+    Parse HDHI date strings into datetimes.
+
+    The extract mixes two forms: unpadded m/d/Y ("4/1/2017", "10/3/2017") and
+    zero-padded d/m/Y ("06/01/2018", "22/04/2017"). A padded part means d/m/Y,
+    a single-digit part means m/d/Y, and a part above 12 leaves one reading.
+    That still leaves strings whose parts are both 10-12 ("11/10/2017" is
+    10 Nov as m/d/Y and 11 Oct as d/m/Y). Those take the reading closer to
+    `near`, an expected date per row, where it is given; otherwise the form
+    of the closest preceding (or following) unambiguous row, and d/m/Y, the
+    extract's majority form, when there is none. Anything else falls back to
+    ISO or the `month_year` form ("Oct-17").
+
+    A few hundred distinct dates repeat across millions of admissions, so
+    each distinct string is parsed once and the result mapped back by code.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    codes, uniques = pd.factorize(values.astype("str"))
+    uniques = pd.Series(uniques, dtype="str")
+    parts = uniques.str.extract(r"^(\d{1,2})/(\d{1,2})/\d{4}$").fillna("")
+    padded = parts[0].str.startswith("0") | parts[1].str.startswith("0")
+    short = (parts[0].str.len() == 1) | (parts[1].str.len() == 1)
+    month_first = pd.to_datetime(uniques, format="%m/%d/%Y", errors="coerce")
+    day_first = pd.to_datetime(uniques, format="%d/%m/%Y", errors="coerce")
+
+    # The form a string was written in (1 = d/m/Y, -1 = m/d/Y, 0 = can't tell)
+    form = np.where(padded, 1, np.where(short, -1, 0)).astype(np.int8)
+    form[(form == 0) & day_first.isna().to_numpy() & month_first.notna().to_numpy()] = -1
+    form[(form == 0) & month_first.isna().to_numpy() & day_first.notna().to_numpy()] = 1
+    ambiguous = (form == 0) & month_first.notna().to_numpy() & (month_first != day_first).to_numpy()
+    # A form whose reading is impossible ("13/1/2018") falls back to the other one
+    parsed = day_first.where(form >= 0, month_first).fillna(month_first).fillna(day_first)
+    for fmt in ["ISO8601", "%b-%y"]:
+        retry = parsed.isna() & ~ambiguous
+        if not retry.any():
+            break
+        parsed[retry] = pd.to_datetime(uniques[retry], format=fmt, errors="coerce")
+
+    # Missing values have code -1, which picks the trailing NaT / unknown form
+    lookup = np.append(parsed.to_numpy(dtype="datetime64[ns]"), np.datetime64("NaT", "ns"))
+    result = lookup[codes]
+    rows = np.append(ambiguous, False)[codes]
+    if rows.any():
+        month_first = month_first.to_numpy(dtype="datetime64[ns]")[codes[rows]]
+        day_first = day_first.to_numpy(dtype="datetime64[ns]")[codes[rows]]
+        resolved = np.zeros(len(month_first), dtype=bool)
+        choose_day_first = np.ones(len(month_first), dtype=bool)
+        if near is not None:
+            near = pd.to_datetime(pd.Series(near)).to_numpy(dtype="datetime64[ns]")[rows]
+            resolved = ~np.isnat(near)
+            choose_day_first = np.abs(day_first - near) <= np.abs(month_first - near)
+        if not resolved.all():
+            neighbours = pd.Series(np.append(form, 0)[codes], dtype="float32").replace(0, np.nan)
+            neighbours = neighbours.ffill().bfill().fillna(1).to_numpy()[rows]
+            choose_day_first = np.where(resolved, choose_day_first, neighbours > 0)
+        result[rows] = np.where(choose_day_first, day_first, month_first)
+    return pd.Series(result, index=values.index, name=values.name)
+
+
+def parse_admission_dates(df, admit_col='doa', discharge_col='dod', month_col='month_year',
+                          los_col='duration_of_stay'):
+    """
+    (admission, discharge) dates of `df`. Ambiguous admission dates resolve
+    against the row's `month_year`, discharge dates against admission plus
+    `duration_of_stay` (which counts both end days).
+    """
+    near = None
+    if month_col in df.columns:
+        near = parse_hdhi_dates(df[month_col]) + pd.Timedelta(days=14)
+    admit = parse_hdhi_dates(df[admit_col], near=near)
+    near = admit
+    if los_col in df.columns:
+        stay = pd.to_timedelta(pd.to_numeric(df[los_col], errors='coerce') - 1, unit='D')
+        near = (admit + stay).fillna(admit)
+    return admit, parse_hdhi_dates(df[discharge_col], near=near)
+
+
+def read_daily_pollution(path):
+    """The pollution file's daily averages (POLLUTION_COLUMNS names), indexed by date."""
+    raw = pd.read_csv(path, encoding="utf-8-sig")
+    raw.columns = raw.columns.str.strip()
+    daily = raw[list(POLLUTION_COLUMNS)].rename(columns=POLLUTION_COLUMNS).apply(
+        pd.to_numeric, errors='coerce').astype('float32')
+    daily.index = parse_hdhi_dates(raw['DATE'].astype(str))
+    return daily[daily.index.notna() & ~daily.index.duplicated(keep='last')]
+
+
+def join_pollution(df, daily, prefix=''):
+    """
+    `df` plus the `daily` readings of each admission day, as `prefix` + column.
+    Admission dates resolve as in `parse_admission_dates`; a day without a
+    reading gives NaN.
+    """
+    admitted = parse_admission_dates(df)[0]
+    values = daily.reindex(admitted.to_numpy()).to_numpy()
+    return df.assign(**{prefix + col: values[:, j] for j, col in enumerate(daily.columns)})
+
+
+def memory_mb(df):
+    return round(df.memory_usage(deep=True).sum() / 2 ** 20, 2)
@@ -0,0 +1,263 @@
+"""
+Seeded generator for synthetic HDHI admission, mortality and pollution files.
+
+The files use the exact headers of the real extracts in `Data/` (including
+the BOM, the trailing space in `SMOKING ` and the mixed m/d/Y and dd/mm/YYYY
+date formats) so they can be fed to Step 0 and the warehouse loader in place
+of the real data.
+
+Marginals follow the 15.7k-row HDHI extract: age, gender, rural/urban and
+admission type mix, comorbidity prevalence, lab medians and spreads, LOS and
+ICU stay, outcome mix and lab missingness. Correlations come from one latent
+severity score per admission (driven by age and emergency admission) that
+raises acute-condition flags, shifts the labs (urea, creatinine, BNP up; Hb
+and EF down), lengthens stays and raises the odds of EXPIRY. Daily PM2.5
+follows the Delhi winter peak, and admission volume rises with it.
+
+Admissions are written in chunks, so 10M rows need only one chunk in memory.
+"""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+SCALES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+
+ADMISSION_FILE = "HDHI Admission data.csv"
+MORTALITY_FILE = "HDHI Mortality Data.csv"
+POLLUTION_FILE = "HDHI Pollution Data.csv"
+HEADINGS_FILE = "table_headings.csv"
+
+# Binary columns in file order: (prevalence, loading on the severity score)
+CONDITIONS = {
+    'SMOKING ': (0.050, 0.0), 'ALCOHOL': (0.065, 0.0), 'DM': (0.323, 0.2), 'HTN': (0.486, 0.1),
+    'CAD': (0.670, 0.1), 'PRIOR CMP': (0.154, 0.3), 'CKD': (0.098, 0.4),
+}
+LAB_COLUMNS = ['HB', 'TLC', 'PLATELETS', 'GLUCOSE', 'UREA', 'CREATININE', 'BNP']
+DIAGNOSES = {
+    'RAISED CARDIAC ENZYMES': (0.198, 0.6), 'SEVERE ANAEMIA': (0.019, 0.3), 'ANAEMIA': (0.177, 0.3),
+    'STABLE ANGINA': (0.082, -0.5), 'ACS': (0.366, 0.3), 'STEMI': (0.140, 0.5),
+    'ATYPICAL CHEST PAIN': (0.026, -0.5), 'HEART FAILURE': (0.25, 0.6), 'HFREF': (0.154, 0.6),
+    'HFNEF': (0.137, 0.0), 'VALVULAR': (0.035, 0.1), 'CHB': (0.026, 0.2), 'SSS': (0.007, 0.1),
+    'AKI': (0.222, 0.7), 'CVA INFRACT': (0.029, 0.4), 'CVA BLEED': (0.004, 0.5), 'AF': (0.051, 0.2),
+    'VT': (0.033, 0.5), 'PSVT': (0.008, 0.0), 'CONGENITAL': (0.010, 0.0), 'UTI': (0.062, 0.3),
+    'NEURO CARDIOGENIC SYNCOPE': (0.008, -0.3), 'ORTHOSTATIC': (0.008, -0.3),
+    'INFECTIVE ENDOCARDITIS': (0.002, 0.4), 'DVT': (0.013, 0.2), 'CARDIOGENIC SHOCK': (0.060, 0.7),
+    'SHOCK': (0.047, 0.7), 'PULMONARY EMBOLISM': (0.015, 0.5), 'CHEST INFECTION': (0.022, 0.4),
+}
+ADMISSION_COLUMNS = (
+    ['SNO', 'MRD No.', 'D.O.A', 'D.O.D', 'AGE', 'GENDER', 'RURAL', 'TYPE OF ADMISSION-EMERGENCY/OPD',
+     'month year', 'DURATION OF STAY', 'duration of intensive unit stay', 'OUTCOME']
+    + list(CONDITIONS) + LAB_COLUMNS + ['RAISED CARDIAC ENZYMES', 'EF'] + list(DIAGNOSES)[1:]
+)
+POLLUTION_COLUMNS = [
+    'DATE', 'AQI', 'PM2.5 AVG', 'PM2.5 MIN', 'PM2.5 MAX', 'PM10 AVG', 'PM10 MIN', 'PM10 MAX',
+    'NO2 AVG', 'NO2 MIN', 'NO2 MAX', 'NH3 AVG', 'NH3 MIN', 'NH3 MAX', 'SO2 AVG', 'SO2 MIN', 'SO2 MAX',
+    'CO AVG', 'CO MIN', 'CO MAX', 'OZONE AVG', 'OZONE MIN', 'OZONE MAX', 'PROMINENT POLLUTENT',
+    'MAX TEMP', 'MIN TEMP', 'HUMIDITY'
+]
+MORTALITY_COLUMNS = ['S.NO', 'MRD', 'AGE', 'GENDER ', 'RURAL/URBAN', 'DATE OF BROUGHT DEAD']
+
+INTEGER_LABS = ['PLATELETS', 'GLUCOSE', 'UREA', 'BNP', 'EF']
+LAB_MISSING_RATE = 0.016
+BNP_MISSING_RATE = 0.53
+EF_MISSING_RATE = 0.09
+DAY_FIRST_RATE = 0.6       # share of dd/mm/YYYY dates, as in the real extract
+BROUGHT_DEAD_RATE = 0.023  # mortality file rows per admission
+PATIENT_POOL_RATE = 2.0    # MRD pool per admission; uniform draws leave ~78% unique, as in HDHI
+
+
+def _logit(p):
+    return np.log(p / (1 - p))
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+def _format_dates(calendar, day_index, rng):
+    """
+    Mix m/d/Y and zero-padded dd/mm/YYYY like the source system. Only the
+    calendar is formatted; rows pick their string by day index. As in the
+    extract, days whose day and month are both 10-12 ("11/10/2017") read
+    either way; `month year` and the length of stay are written from the
+    same day index, which is what `schema.parse_admission_dates` resolves
+    them with.
+    """
+    month_first = np.array([f"{d.month}/{d.day}/{d.year}" for d in calendar], dtype=object)
+    day_first = np.array(calendar.strftime("%d/%m/%Y"), dtype=object)
+    return np.where(rng.random(len(day_index)) < DAY_FIRST_RATE, day_first[day_index], month_first[day_index])
+
+
+def generate_pollution(start, days, rng):
+    """Daily pollution readings with a winter PM2.5 peak and summer ozone/temperature peak."""
+    dates = pd.date_range(start, periods=days, freq="D")
+    doy = dates.dayofyear.to_numpy()
+    winter = np.cos(2 * np.pi * (doy - 355) / 365.25)
+    summer = -winter
+
+    pm25 = np.clip(np.exp(np.log(85) + 0.75 * winter + rng.normal(0, 0.3, days)), 11, 419)
+    pm10 = np.clip(pm25 * rng.uniform(0.8, 1.4, days), 18, 486)
+    no2 = np.clip(np.exp(np.log(26) + 0.3 * winter + rng.normal(0, 0.45, days)), 1, 797)
+    nh3 = np.clip(rng.lognormal(np.log(5), 0.5, days), 1, 188)
+    so2 = np.clip(rng.lognormal(np.log(9), 0.5, days), 2, 88)
+    co = np.clip(35 + 10 * winter + rng.normal(0, 10, days), 5, 100)
+    ozone = np.clip(23 + 10 * summer + rng.normal(0, 8, days), 3, 78)
+    aqi = np.maximum(pm25, pm10) * rng.uniform(1.0, 1.15, days)
+
+    def spread(avg, low, high):
+        return (np.round(avg * rng.uniform(*low, len(avg))).clip(1), np.round(avg * rng.uniform(*high, len(avg))))
+
+    frame = pd.DataFrame({'DATE': [f"{d.month}/{d.day}/{d.year}" for d in dates], 'AQI': np.round(aqi)})
+    for name, avg in [('PM2.5', pm25), ('PM10', pm10), ('NO2', no2), ('NH3', nh3), ('SO2', so2),
+                      ('CO', co), ('OZONE', ozone)]:
+        low, high = spread(avg, (0.3, 0.7), (1.3, 2.2))
+        frame[f'{name} AVG'], frame[f'{name} MIN'], frame[f'{name} MAX'] = np.round(avg), low, high
+    frame['PROMINENT POLLUTENT'] = np.where(pm10 > pm25, 'PM10', 'PM2.5')
+    frame.loc[rng.random(days) < 0.06, 'PROMINENT POLLUTENT'] = rng.choice(['CO', 'NO2', 'SO2'], p=[0.7, 0.25, 0.05])
+    frame['MAX TEMP'] = np.round(32 + 8 * summer + rng.normal(0, 2.5, days))
+    frame['MIN TEMP'] = np.round(frame['MAX TEMP'] - rng.uniform(8, 16, days))
+    frame['HUMIDITY'] = np.round(np.clip(40 + 15 * np.sin(2 * np.pi * (doy - 150) / 365.25) + rng.normal(0, 12, days), 5, 92))
+    return frame[POLLUTION_COLUMNS], pm25
+
+
+def generate_admissions(n, first_sno, dates, day_weights, n_patients, rng):
+    """One chunk of admission rows."""
+    age = np.clip(np.round(rng.normal(61.4, 13.4, n)), 1, 110).astype(int)
+    male = rng.random(n) < 0.634
+    emergency = rng.random(n) < 0.693
+    severity = rng.normal(0, 1, n) + 0.025 * (age - 61) + 0.3 * emergency
+
+    frame = {
+        'SNO': np.arange(first_sno, first_sno + n),
+        'MRD No.': 100000 + rng.integers(0, n_patients, n),
+        'AGE': age,
+        'GENDER': np.where(male, 'M', 'F'),
+        'RURAL': np.where(rng.random(n) < 0.234, 'R', 'U'),
+        'TYPE OF ADMISSION-EMERGENCY/OPD': np.where(emergency, 'E', 'O'),
+    }
+    flags = {}
+    for name, (prevalence, loading) in {**CONDITIONS, **DIAGNOSES}.items():
+        logit = _logit(prevalence) + loading * severity
+        if name in ('SMOKING ', 'ALCOHOL'):
+            logit = logit + np.where(male, 0.4, -1.5)
+        flags[name] = (rng.random(n) < _sigmoid(logit)).astype(int)
+    # Heart failure is split into reduced / normal EF sub-types
+    reduced = rng.random(n) < _sigmoid(_logit(0.53) + 0.5 * severity)
+    flags['HFREF'] = flags['HEART FAILURE'] & reduced
+    flags['HFNEF'] = flags['HEART FAILURE'] & ~reduced
+
+    z = severity
+    labs = {
+        'HB': np.round(np.clip(12.4 - 0.5 * z - 1.5 * flags['ANAEMIA'] + rng.normal(0, 1.9, n), 3, 22), 1),
+        'TLC': np.round(np.exp(np.log(10.1) + 0.15 * z + rng.normal(0, 0.4, n)), 1),
+        'PLATELETS': np.round(np.clip(rng.normal(238, 100, n), 10, 900)),
+        'GLUCOSE': np.round(np.exp(np.log(125) + 0.35 * flags['DM'] + 0.05 * z + rng.normal(0, 0.3, n))),
+        'UREA': np.round(np.exp(np.log(33) + 0.3 * z + 0.7 * flags['CKD'] + rng.normal(0, 0.45, n))),
+        'CREATININE': np.round(np.exp(np.log(0.95) + 0.25 * z + 0.8 * flags['CKD'] + rng.normal(0, 0.35, n)), 2),
+        'BNP': np.round(np.exp(np.log(330) + 0.4 * z + 0.8 * flags['HEART FAILURE'] + rng.normal(0, 0.9, n))),
+    }
+    ef = np.round(np.clip(46 - 4 * z - 9 * flags['HFREF'] + rng.normal(0, 10, n), 10, 65)).astype(float)
+
+    los = np.maximum(1, np.round(rng.gamma(2.2, 2.9 * np.exp(0.2 * z), n))).astype(int)
+    icu = np.minimum(los, np.round(los * rng.beta(2, 1.4, n) * np.where(emergency, 1.0, 0.5))).astype(int)
+    expiry = rng.random(n) < _sigmoid(-3.45 + 0.8 * z + 1.3 * flags['SHOCK'] + 1.3 * flags['CARDIOGENIC SHOCK'])
+    dama = ~expiry & (rng.random(n) < 0.061)
+    # Deaths and DAMA leave earlier than routine discharges
+    los = np.where(expiry | dama, np.maximum(1, np.round(los * 0.8)), los).astype(int)
+    icu = np.minimum(icu, los)
+
+    doa = rng.choice(len(dates), size=n, p=day_weights)
+    dod = doa + los - 1
+    calendar = pd.date_range(dates[0], periods=len(dates) + los.max(), freq="D")
+    frame.update({
+        'D.O.A': _format_dates(calendar, doa, rng),
+        'D.O.D': _format_dates(calendar, dod, rng),
+        'month year': np.array(calendar.strftime("%b-%y"), dtype=object)[doa],
+        'DURATION OF STAY': los,
+        'duration of intensive unit stay': icu,
+        'OUTCOME': np.select([expiry, dama], ['EXPIRY', 'DAMA'], 'DISCHARGE'),
+        'EF': ef,
+    })
+    frame.update(flags)
+
+    frame = pd.DataFrame(frame)
+    for col, values in labs.items():
+        missing = rng.random(n) < (BNP_MISSING_RATE if col == 'BNP' else LAB_MISSING_RATE)
+        frame[col] = np.where(missing, np.nan, values)
+    frame.loc[rng.random(n) < EF_MISSING_RATE, 'EF'] = np.nan
+    # Whole-number labs are written without a decimal point, as in the source
+    for col in INTEGER_LABS:
+        frame[col] = frame[col].astype("Int64")
+    # The source system writes a literal EMPTY for some missing labs
+    lab_frame = frame[LAB_COLUMNS].astype(object)
+    empty = lab_frame.isna() & (rng.random((n, len(LAB_COLUMNS))) < 0.1)
+    frame[LAB_COLUMNS] = lab_frame.mask(empty, "EMPTY")
+    return frame[ADMISSION_COLUMNS]
+
+
+def generate_mortality(n, dates, day_weights, rng):
+    """Brought-dead register; these patients never appear in the admission file."""
+    died = dates[rng.choice(len(dates), size=n, p=day_weights)].sort_values()
+    return pd.DataFrame({
+        'S.NO': np.arange(1, n + 1),
+        'MRD': 900000 + np.arange(n),
+        'AGE': np.clip(np.round(rng.normal(62.7, 13.1, n)), 1, 105).astype(int),
+        'GENDER ': np.where(rng.random(n) < 0.65, 'M', 'F'),
+        'RURAL/URBAN': np.where(rng.random(n) < 0.3, 'R', 'U'),
+        'DATE OF BROUGHT DEAD': [f"{d.month}/{d.day}/{d.year}" for d in died],
+    })[MORTALITY_COLUMNS]
+
+
+def generate_hdhi(n_admissions, out_dir, seed=42, start="2017-04-01", days=730, chunk_size=250000):
+    """
+    Write the three HDHI files for `n_admissions` rows into `out_dir`, plus a
+    copy of the real `table_headings.csv` schema reference that Step 0 reads.
+    Returns {'admissions': path, 'mortality': path, 'pollution': path, 'headings': path}.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {
+        'admissions': os.path.join(out_dir, ADMISSION_FILE),
+        'mortality': os.path.join(out_dir, MORTALITY_FILE),
+        'pollution': os.path.join(out_dir, POLLUTION_FILE),
+        'headings': os.path.join(out_dir, HEADINGS_FILE),
+    }
+    from carepulse.paths import TABLE_HEADINGS
+    shutil.copyfile(TABLE_HEADINGS, paths['headings'])
+
+    # Pollution starts a week early, as in the real extract
+    pollution, pm25 = generate_pollution(pd.Timestamp(start) - pd.Timedelta(days=7), days + 7, rng)
+    pollution.to_csv(paths['pollution'], index=False, encoding="utf-8-sig")
+    dates = pd.date_range(start, periods=days, freq="D")
+    # Admission volume rises ~25% from a clean day to a hazardous one
+    day_weights = 1 + 0.25 * (pm25[7:] - pm25.min()) / (pm25.max() - pm25.min())
+    day_weights = day_weights / day_weights.sum()
+
+    n_patients = max(1, int(n_admissions * PATIENT_POOL_RATE))
+    written = 0
+    while written < n_admissions:
+        n = min(chunk_size, n_admissions - written)
+        chunk = generate_admissions(n, written + 1, dates, day_weights, n_patients, rng)
+        chunk.to_csv(paths['admissions'], mode="w" if written == 0 else "a", index=False,
+                     header=written == 0, encoding="utf-8-sig" if written == 0 else "utf-8")
+        written += n
+
+    generate_mortality(max(1, int(n_admissions * BROUGHT_DEAD_RATE)), dates, day_weights, rng).to_csv(
+        paths['mortality'], index=False, encoding="utf-8-sig")
+    return paths
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate synthetic HDHI files")
+    parser.add_argument("scale", help=f"row count or one of {', '.join(SCALES)}")
+    parser.add_argument("--out-dir", default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = SCALES.get(args.scale) or int(args.scale)
+    out_dir = args.out_dir or os.path.join("synthetic", args.scale)
+    print(generate_hdhi(rows, out_dir, seed=args.seed))
@@ -0,0 +1,291 @@
+"""
+Declarative validation for the HDHI admissions extract.
+
+Rules are rows of a table, like the intervention rules of Step 8:
+
+    required    the value is present
+    numeric     a present value parses as a number
+    date        a present value parses as an HDHI date
+    range       a present number lies within [min, max]
+    allowed     a present value is one of `values`
+    compare     `column <operator> other` holds where both values are present
+    reference   a present value occurs in the named reference set
+
+Comparisons are made as numbers, dates or calendar months (`kind`). doa
+and dod are read together with month_year and the length of stay, which
+settle the dates the extract writes either way round (see
+`schema.parse_hdhi_dates`); `doa_matches_month_year` checks the result.
+
+`action` decides what a violation does: `quarantine` moves the row out of
+the clean data (into the quarantine file, with the rules it failed), while
+`warn` only counts it in the report. The placeholders in
+`schema.MISSING_MARKERS` count as missing, not as malformed.
+
+Each chunk is checked column-wise. Text columns are factorized once, and
+parsing, missing markers and allowed values are worked out on the distinct
+values and mapped back by code; every rule is then one boolean mask over the
+chunk, and the masks are combined per action. Nothing loops over rows.
+"""
+import operator
+import os
+
+import numpy as np
+import pandas as pd
+
+from carepulse.schema import MISSING_MARKERS, parse_admission_dates, parse_hdhi_dates
+
+CODE_VALUES = {
+    'gender': ('M', 'F'),
+    'rural': ('R', 'U'),
+    'type_of_admissionemergencyopd': ('E', 'O'),
+    'outcome': ('DISCHARGE', 'EXPIRY', 'DAMA'),
+}
+BINARY_COLUMNS = [
+    'smoking', 'alcohol', 'dm', 'htn', 'cad', 'prior_cmp', 'ckd', 'raised_cardiac_enzymes',
+    'severe_anaemia', 'anaemia', 'stable_angina', 'acs', 'stemi', 'atypical_chest_pain',
+    'heart_failure', 'hfref', 'hfnef', 'valvular', 'chb', 'sss', 'aki', 'cva_infract', 'cva_bleed',
+    'af', 'vt', 'psvt', 'congenital', 'uti', 'neuro_cardiogenic_syncope', 'orthostatic',
+    'infective_endocarditis', 'dvt', 'cardiogenic_shock', 'shock', 'pulmonary_embolism', 'chest_infection'
+]
+# Bounds of what is physically possible (not clinically normal), in the extract's units
+NUMERIC_RANGES = {
+    'age': (0, 120),
+    'duration_of_stay': (0, 365),
+    'duration_of_intensive_unit_stay': (0, 365),
+    'hb': (0, 30),
+    'tlc': (0, 500),
+    'platelets': (0, 2000),
+    'glucose': (0, 2000),
+    'urea': (0, 600),
+    'creatinine': (0, 30),
+    'bnp': (0, 35000),
+    'ef': (0, 100),
+}
+
+VALIDATION_RULES = pd.DataFrame(
+    [
+        {'rule': f"{col}_required", 'check': 'required', 'column': col, 'action': 'quarantine'}
+        for col in ['mrd_no', 'doa', 'dod', 'age']
+    ] + [
+        {'rule': f"{col}_date", 'check': 'date', 'column': col, 'action': 'quarantine'}
+        for col in ['doa', 'dod']
+    ] + [
+        {'rule': 'dod_not_before_doa', 'check': 'compare', 'column': 'dod', 'operator': '>=', 'other': 'doa',
+         'kind': 'date', 'action': 'quarantine'},
+        {'rule': 'doa_matches_month_year', 'check': 'compare', 'column': 'doa', 'operator': '==',
+         'other': 'month_year', 'kind': 'month', 'action': 'quarantine'},
+        {'rule': 'icu_stay_within_stay', 'check': 'compare', 'column': 'duration_of_intensive_unit_stay',
+         'operator': '<=', 'other': 'duration_of_stay', 'kind': 'number', 'action': 'warn'},
+        {'rule': 'hfref_implies_heart_failure', 'check': 'compare', 'column': 'hfref', 'operator': '<=',
+         'other': 'heart_failure', 'kind': 'number', 'action': 'warn'},
+        {'rule': 'doa_in_pollution_calendar', 'check': 'reference', 'column': 'doa', 'reference': 'pollution_dates',
+         'kind': 'date', 'action': 'warn'},
+    ] + [
+        {'rule': f"{col}_numeric", 'check': 'numeric', 'column': col, 'action': 'quarantine'}
+        for col in NUMERIC_RANGES
+    ] + [
+        {'rule': f"{col}_range", 'check': 'range', 'column': col, 'min': low, 'max': high, 'action': 'quarantine'}
+        for col, (low, high) in NUMERIC_RANGES.items()
+    ] + [
+        {'rule': f"{col}_code", 'check': 'allowed', 'column': col, 'values': values, 'action': 'quarantine'}
+        for col, values in CODE_VALUES.items()
+    ] + [
+        {'rule': f"{col}_binary", 'check': 'allowed', 'column': col, 'values': ('0', '1'), 'action': 'quarantine'}
+        for col in BINARY_COLUMNS
+    ]
+)
+
+
+def clean_column_names(columns):
+    """Source headers as the rules name them (the same cleaning as Step 0), e.g. 'D.O.A' -> 'doa'."""
+    return columns.str.strip().str.lower().str.replace(" ", "_").str.replace(r"[^\w\s]", "", regex=True)
+
+
+def _parse(values, kind):
+    if kind == 'date':
+        return parse_hdhi_dates(values)
+    return pd.to_numeric(values, errors='coerce')
+
+
+class _Column:
+    """One column of a chunk, decoded once and shared by every rule on it."""
+
+    def __init__(self, values, decode=True, dates=None):
+        self.values = values
+        self.text = not pd.api.types.is_numeric_dtype(values)
+        # Dates resolved with the help of other columns replace the column's own parse
+        self._parsed = {} if dates is None else {'date': dates}
+        if self.text and decode:
+            self.codes, uniques = pd.factorize(values)
+            self.uniques = pd.Series(uniques, dtype=object)
+            self.missing = self._map(self.uniques.isin(MISSING_MARKERS).to_numpy(), True)
+        elif self.text:
+            # Only presence is checked (e.g. a high-cardinality id), so skip the factorize
+            self.missing = (values.isna() | values.isin(MISSING_MARKERS)).to_numpy()
+        else:
+            self.missing = values.isna().to_numpy()
+
+    def _map(self, per_unique, fill):
+        # Missing values have code -1, which picks the trailing fill value
+        return np.append(per_unique, np.array([fill], dtype=per_unique.dtype))[self.codes]
+
+    def parsed(self, kind):
+        if kind not in self._parsed:
+            if kind == 'month':
+                months = self.parsed('date').to_numpy(dtype="datetime64[ns]").astype("datetime64[M]")
+                self._parsed[kind] = pd.Series(months.astype("datetime64[ns]"), index=self.values.index)
+            elif self.text:
+                per_unique = _parse(self.uniques, kind).to_numpy(
+                    dtype="datetime64[ns]" if kind == 'date' else float)
+                fill = np.datetime64("NaT", "ns") if kind == 'date' else np.nan
+                self._parsed[kind] = pd.Series(self._map(per_unique, fill), index=self.values.index)
+            else:
+                self._parsed[kind] = _parse(self.values, kind)
+        return self._parsed[kind]
+
+    def isin(self, allowed):
+        allowed = list(allowed)
+        if self.text:
+            return self._map(self.uniques.isin(allowed).to_numpy(), False)
+        return self.values.isin(pd.to_numeric(pd.Series(allowed), errors='coerce').dropna()).to_numpy()
+
+
+class ValidationEngine:
+    CHECKS = {'required', 'numeric', 'date', 'range', 'allowed', 'compare', 'reference'}
+    ACTIONS = {'quarantine', 'warn'}
+    OPERATORS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+                 '==': operator.eq, '!=': operator.ne}
+
+    def __init__(self, rules=VALIDATION_RULES, references=None, chunk_size=250000):
+        rules = rules.reset_index(drop=True)
+        for field, allowed in [('check', self.CHECKS), ('action', self.ACTIONS)]:
+            unknown = set(rules[field]) - allowed
+            if unknown:
+                raise ValueError(f"Unsupported rule {field}s: {sorted(unknown)}")
+        if 'operator' in rules.columns:
+            unknown = set(rules['operator'].dropna()) - set(self.OPERATORS)
+            if unknown:
+                raise ValueError(f"Unsupported rule operators: {sorted(unknown)}")
+        self.rules = rules
+        self.chunk_size = chunk_size
+        # Columns whose values (not just presence) are looked at
+        valued = rules[rules['check'] != 'required']
+        self._decoded = set(valued['column']) | set(valued.get('other', pd.Series(dtype=object)).dropna())
+        self.references = dict(references or {})
+        self._parsed_references = {}
+        self.reset()
+
+    def reset(self):
+        """Clear the counts accumulated by earlier `validate` calls."""
+        self.rows_checked = 0
+        self.rows_quarantined = 0
+        self.violations = np.zeros(len(self.rules), dtype=np.int64)
+        self.examples = [[] for _ in range(len(self.rules))]
+
+    def _reference(self, name, kind):
+        if (name, kind) not in self._parsed_references:
+            self._parsed_references[name, kind] = _parse(pd.Series(self.references[name]), kind).dropna().unique()
+        return self._parsed_references[name, kind]
+
+    def check(self, chunk):
+        """Violation mask per rule, as a (rows x rules) boolean matrix."""
+        columns = {}
+        dates = {}
+        if {'doa', 'dod'} <= set(chunk.columns):
+            dates['doa'], dates['dod'] = parse_admission_dates(chunk)
+
+        def column(name):
+            if name not in columns:
+                columns[name] = _Column(chunk[name], decode=name in self._decoded, dates=dates.get(name))
+            return columns[name]
+
+        # Column-major, so each rule writes (and the report reads) one contiguous mask
+        masks = np.zeros((len(chunk), len(self.rules)), dtype=bool, order='F')
+        for i, rule in self.rules.iterrows():
+            col = rule['column']
+            if col not in chunk.columns:
+                continue
+            check = rule['check']
+            if check == 'required':
+                masks[:, i] = column(col).missing
+            elif check in ('numeric', 'date'):
+                values = column(col).parsed('number' if check == 'numeric' else 'date')
+                masks[:, i] = values.isna().to_numpy() & ~column(col).missing
+            elif check == 'range':
+                values = column(col).parsed('number').to_numpy(dtype=float)
+                with np.errstate(invalid='ignore'):
+                    masks[:, i] = (values < rule['min']) | (values > rule['max'])
+            elif check == 'allowed':
+                masks[:, i] = ~column(col).missing & ~column(col).isin(rule['values'])
+            elif check == 'compare':
+                other = rule['other']
+                if other not in chunk.columns:
+                    continue
+                left, right = column(col).parsed(rule['kind']), column(other).parsed(rule['kind'])
+                both = left.notna().to_numpy() & right.notna().to_numpy()
+                holds = self.OPERATORS[rule['operator']](left, right).to_numpy(dtype=bool)
+                masks[:, i] = both & ~holds
+            elif check == 'reference':
+                if rule['reference'] not in self.references:
+                    continue
+                values = column(col).parsed(rule['kind'])
+                reference = self._reference(rule['reference'], rule['kind'])
+                masks[:, i] = values.notna().to_numpy() & ~values.isin(reference).to_numpy()
+        return masks
+
+    def _tally(self, chunk):
+        """Count the violations of `chunk`; returns its quarantine mask and the failed rules of those rows."""
+        masks = self.check(chunk)
+        quarantine_rules = (self.rules['action'] == 'quarantine').to_numpy()
+        bad = masks[:, quarantine_rules].any(axis=1)
+
+        self.rows_checked += len(chunk)
+        self.rows_quarantined += int(bad.sum())
+        self.violations += masks.sum(axis=0)
+        for i in np.flatnonzero(masks.any(axis=0)):
+            if len(self.examples[i]) < 3 and self.rules.at[i, 'column'] in chunk.columns:
+                values = chunk[self.rules.at[i, 'column']].to_numpy()[masks[:, i]]
+                self.examples[i].extend(str(v) for v in values[:3 - len(self.examples[i])])
+
+        # Rule names per quarantined row, built one rule at a time
+        reasons = np.full(int(bad.sum()), "", dtype=object)
+        for i in np.flatnonzero(quarantine_rules):
+            reasons[masks[bad, i]] += self.rules.at[i, 'rule'] + ";"
+        return bad, [r.rstrip(";") for r in reasons]
+
+    def _split(self, frame, bad, reasons):
+        if not bad.any():
+            return frame, frame.iloc[:0].assign(failed_rules=pd.Series(dtype=object))
+        return frame[~bad], frame[bad].assign(failed_rules=reasons)
+
+    def validate(self, frame):
+        """Split `frame` into (clean rows, quarantined rows with the rules they failed)."""
+        bad, reasons = np.zeros(len(frame), dtype=bool), []
+        for start in range(0, len(frame), self.chunk_size):
+            chunk_bad, chunk_reasons = self._tally(frame.iloc[start:start + self.chunk_size])
+            bad[start:start + self.chunk_size] = chunk_bad
+            reasons.extend(chunk_reasons)
+        # One split of the whole frame instead of a copy per chunk
+        return self._split(frame, bad, reasons)
+
+    def validate_csv(self, path, quarantine_path, chunksize=None, **read_kwargs):
+        """
+        Stream a CSV through the rules: yields clean chunks (with cleaned
+        column names) and appends quarantined rows to `quarantine_path` as it goes.
+        """
+        if os.path.exists(quarantine_path):
+            os.remove(quarantine_path)
+        for chunk in pd.read_csv(path, chunksize=chunksize or self.chunk_size, **read_kwargs):
+            chunk.columns = clean_column_names(chunk.columns)
+            ok, bad = self._split(chunk, *self._tally(chunk))
+            if len(bad):
+                bad.to_csv(quarantine_path, mode="a", index=False, header=not os.path.exists(quarantine_path))
+            yield ok
+
+    def report(self):
+        """One row per rule: violations, share of checked rows and a few offending values."""
+        report = self.rules[['rule', 'check', 'column', 'action']].copy()
+        report['violations'] = self.violations
+        report['violation_pct'] = (100.0 * self.violations / max(self.rows_checked, 1)).round(3)
+        report['examples'] = [", ".join(values) for values in self.examples]
+        return report
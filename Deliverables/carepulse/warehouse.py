@@ -0,0 +1,590 @@
+"""
+Bulk loader for the CarePulse HDHI star schema defined in `DB Design.sql`.
+
+The master dataset is streamed into `stg_master_hospital_data` in batches
+(COPY on PostgreSQL, one executemany per batch on SQLite), then the
+dimensions and `fact_admissions` are filled with set-based INSERT ... SELECT
+statements. Per-row triggers on the fact table can be deferred for the bulk
+insert and replaced by one set-based pass afterwards.
+
+`HDHI Pollution Data.csv` fills `dim_pollution` (with PM2.5 banding), the
+pollution columns of `fact_admissions`, and date-keyed weekly/monthly
+exposure tables, so the pollution queries in Business Analyses.sql become
+indexed lookups instead of ad-hoc aggregation.
+
+Every fact insert is recorded in `load_batches` and every pollution load in
+`pollution_loads`; the analysis cache keys on both. Summary tables are kept
+current by folding only the not-yet-applied batches into them (additive
+upserts), so refresh cost follows the load volume, not the fact table size.
+
+SQLite is the embedded stand-in used for local runs and tests; PostgreSQL
+needs `psycopg2`.
+"""
+import io
+import sqlite3
+import time
+
+import pandas as pd
+
+from carepulse.schema import DEATH_OUTCOMES, parse_admission_dates, parse_hdhi_dates
+
+# Mirrors STEP 1 of DB Design.sql
+STAGING_COLUMNS = [
+    ('sno', 'INT'), ('mrd_no', 'VARCHAR(255)'), ('doa', 'DATE'), ('dod', 'DATE'),
+    ('age', 'INT'), ('gender', 'VARCHAR(255)'), ('rural', 'VARCHAR(255)'),
+    ('type_of_admissionemergencyopd', 'VARCHAR(255)'), ('month_year', 'VARCHAR(255)'),
+    ('duration_of_stay', 'INT'), ('duration_of_intensive_unit_stay', 'INT'),
+    ('outcome', 'VARCHAR(255)'), ('smoking', 'INT'), ('alcohol', 'INT'), ('dm', 'INT'),
+    ('htn', 'INT'), ('cad', 'INT'), ('prior_cmp', 'INT'), ('ckd', 'INT'),
+    ('hb', 'VARCHAR(255)'), ('tlc', 'VARCHAR(255)'), ('platelets', 'VARCHAR(255)'),
+    ('glucose', 'VARCHAR(255)'), ('urea', 'VARCHAR(255)'), ('creatinine', 'VARCHAR(255)'),
+    ('bnp', 'VARCHAR(255)'), ('raised_cardiac_enzymes', 'INT'), ('ef', 'VARCHAR(255)'),
+    ('severe_anaemia', 'INT'), ('anaemia', 'INT'), ('stable_angina', 'INT'), ('acs', 'INT'),
+    ('stemi', 'INT'), ('atypical_chest_pain', 'INT'), ('heart_failure', 'INT'),
+    ('hfref', 'INT'), ('hfnef', 'INT'), ('valvular', 'INT'), ('chb', 'INT'), ('sss', 'INT'),
+    ('aki', 'INT'), ('cva_infract', 'INT'), ('cva_bleed', 'INT'), ('af', 'INT'), ('vt', 'INT'),
+    ('psvt', 'INT'), ('congenital', 'INT'), ('uti', 'INT'),
+    ('neuro_cardiogenic_syncope', 'INT'), ('orthostatic', 'INT'),
+    ('infective_endocarditis', 'INT'), ('dvt', 'INT'), ('cardiogenic_shock', 'INT'),
+    ('shock', 'INT'), ('pulmonary_embolism', 'INT'), ('chest_infection', 'VARCHAR(255)'),
+    ('age_bucket', 'VARCHAR(255)')
+]
+STAGING_NAMES = [name for name, _ in STAGING_COLUMNS]
+INT_COLUMNS = [name for name, sql_type in STAGING_COLUMNS if sql_type == 'INT']
+
+DEATH_OUTCOMES_SQL = "UPPER(outcome) IN ({})".format(", ".join(f"'{o}'" for o in DEATH_OUTCOMES))
+
+LOS_OUTLIER_DAYS = 30
+
+# PM2.5 bands (ug/m3), highest first; same cut-offs as Business Analyses Query 28
+POLLUTION_BANDS = [(150, 'Hazardous'), (100, 'Severe'), (60, 'High')]
+
+# HDHI Pollution Data.csv header -> dim_pollution column
+POLLUTION_COLUMNS = {
+    'DATE': 'recorded_date', 'AQI': 'aqi', 'PM2.5 AVG': 'pm25',
+    'PM10 AVG': 'pm10', 'NO2 AVG': 'no2', 'SO2 AVG': 'so2'
+}
+
+
+def pollution_band_sql(expr):
+    cases = " ".join(f"WHEN {expr} >= {cut} THEN '{band}'" for cut, band in POLLUTION_BANDS)
+    return f"CASE WHEN {expr} IS NULL THEN 'Unknown' {cases} ELSE 'Normal' END"
+
+
+def pollution_band(pm25):
+    """Vectorized PM2.5 banding for a Series."""
+    bands = pd.Series('Normal', index=pm25.index, dtype=object)
+    for cut, band in reversed(POLLUTION_BANDS):
+        bands[pm25 >= cut] = band
+    bands[pm25.isna()] = 'Unknown'
+    return bands
+
+DIALECTS = {
+    'sqlite': {
+        'serial': "INTEGER PRIMARY KEY",
+        'month': "date(doa, 'start of month')",
+        # Period starts of a date expression, filled in as {date}
+        'pollution_week': "date({date}, 'weekday 0', '-6 days')",
+        'pollution_month': "date({date}, 'start of month')",
+        'create_view': "CREATE VIEW IF NOT EXISTS",
+        'param': "?",
+        'date_param': "?",
+        # ISO week: day-of-year of the Thursday in the same ISO week
+        'iso_week': "(CAST(strftime('%j', date(doa, '-3 days', 'weekday 4')) AS INTEGER) - 1) / 7 + 1",
+    },
+    'postgres': {
+        'serial': "SERIAL PRIMARY KEY",
+        'month': "CAST(DATE_TRUNC('month', doa) AS DATE)",
+        'pollution_week': "CAST(DATE_TRUNC('week', {date}) AS DATE)",
+        'pollution_month': "CAST(DATE_TRUNC('month', {date}) AS DATE)",
+        'create_view': "CREATE OR REPLACE VIEW",
+        'param': "%s",
+        # A bare text literal is ambiguous to DATE_TRUNC (timestamp, timestamptz or interval)
+        'date_param': "CAST(%s AS DATE)",
+        'iso_week': "CAST(EXTRACT(WEEK FROM CAST(doa AS DATE)) AS INT)",
+    },
+}
+
+SCHEMA_SQL = [
+    "CREATE TABLE IF NOT EXISTS stg_master_hospital_data ({staging_columns})",
+    """CREATE TABLE IF NOT EXISTS dim_patient (
+        mrd_no VARCHAR(20) PRIMARY KEY,
+        age INT,
+        gender VARCHAR(10)
+    )""",
+    """CREATE TABLE IF NOT EXISTS dim_department (
+        department VARCHAR(100) PRIMARY KEY,
+        specialty VARCHAR(100)
+    )""",
+    """CREATE TABLE IF NOT EXISTS dim_pollution (
+        recorded_date DATE PRIMARY KEY,
+        aqi FLOAT,
+        pm25 FLOAT,
+        pm10 FLOAT,
+        no2 FLOAT,
+        so2 FLOAT,
+        pollution_category VARCHAR(20)
+    )""",
+    """CREATE TABLE IF NOT EXISTS fact_admissions (
+        admission_id {serial},
+        mrd_no VARCHAR(20) REFERENCES dim_patient(mrd_no),
+        doa DATE,
+        dod DATE,
+        age INT,
+        age_bucket VARCHAR(10),
+        gender VARCHAR(10),
+        department VARCHAR(100) REFERENCES dim_department(department),
+        diagnosis TEXT,
+        length_of_stay INT,
+        admission_week INT,
+        is_mortality_case BOOLEAN,
+        pm25 FLOAT,
+        pm10 FLOAT,
+        no2 FLOAT,
+        so2 FLOAT,
+        pollution_category VARCHAR(20),
+        load_batch_id INT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_fact_load_batch ON fact_admissions (load_batch_id)",
+    "CREATE INDEX IF NOT EXISTS idx_fact_doa ON fact_admissions (doa)",
+    "CREATE INDEX IF NOT EXISTS idx_fact_mrd_no ON fact_admissions (mrd_no, doa)",
+    "CREATE INDEX IF NOT EXISTS idx_fact_department ON fact_admissions (department)",
+    "CREATE INDEX IF NOT EXISTS idx_fact_pollution_category ON fact_admissions (pollution_category)",
+    # Pre-aggregated exposure, keyed by period start date (Monday / first of month)
+    """CREATE TABLE IF NOT EXISTS pollution_weekly_exposure (
+        week_start DATE PRIMARY KEY,
+        days INT,
+        avg_aqi FLOAT,
+        avg_pm25 FLOAT,
+        max_pm25 FLOAT,
+        avg_pm10 FLOAT,
+        avg_no2 FLOAT,
+        avg_so2 FLOAT,
+        pollution_category VARCHAR(20)
+    )""",
+    """CREATE TABLE IF NOT EXISTS pollution_monthly_exposure (
+        month_start DATE PRIMARY KEY,
+        days INT,
+        avg_aqi FLOAT,
+        avg_pm25 FLOAT,
+        max_pm25 FLOAT,
+        avg_pm10 FLOAT,
+        avg_no2 FLOAT,
+        avg_so2 FLOAT,
+        pollution_category VARCHAR(20)
+    )""",
+    # Change log of fact loads; summaries_refreshed marks batches already folded into the summaries
+    """CREATE TABLE IF NOT EXISTS load_batches (
+        batch_id INT PRIMARY KEY,
+        loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        row_count INT,
+        summaries_refreshed BOOLEAN DEFAULT FALSE
+    )""",
+    # Change log of pollution loads; a revised reading changes no fact count, only this log
+    """CREATE TABLE IF NOT EXISTS pollution_loads (
+        load_id INT PRIMARY KEY,
+        loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        row_count INT,
+        first_date DATE,
+        last_date DATE
+    )""",
+    # Summary tables carry their additive parts so they can be updated with deltas
+    """CREATE TABLE IF NOT EXISTS monthly_admission_summary (
+        summary_month DATE PRIMARY KEY,
+        total_admissions INT,
+        avg_los FLOAT,
+        mortality_rate FLOAT,
+        los_sum BIGINT,
+        los_count INT,
+        deaths INT
+    )""",
+    """CREATE TABLE IF NOT EXISTS department_summary (
+        department VARCHAR(100) PRIMARY KEY,
+        total_admissions INT,
+        avg_los FLOAT,
+        deaths INT,
+        mortality_rate FLOAT,
+        los_sum BIGINT,
+        los_count INT
+    )""",
+    # Same name and columns as the old materialized view, now always current
+    """{create_view} mv_department_summary AS
+    SELECT department, total_admissions, avg_los, deaths, mortality_rate
+    FROM department_summary""",
+]
+
+# SQLite analogue of tg_flag_los_outlier (Advanced SQL Functiions.sql): RAISE NOTICE becomes a log row
+SQLITE_TRIGGER_SQL = [
+    """CREATE TABLE IF NOT EXISTS los_outlier_log (
+        mrd_no VARCHAR(20),
+        length_of_stay INT
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS tg_flag_los_outlier
+        BEFORE INSERT ON fact_admissions
+        FOR EACH ROW WHEN NEW.length_of_stay > {LOS_OUTLIER_DAYS}
+        BEGIN
+            INSERT INTO los_outlier_log (mrd_no, length_of_stay) VALUES (NEW.mrd_no, NEW.length_of_stay);
+        END""",
+]
+
+DIMENSION_SQL = [
+    # One row per patient; GROUP BY avoids conflicting duplicates within the batch
+    """INSERT INTO dim_patient (mrd_no, age, gender)
+    SELECT CAST(mrd_no AS VARCHAR(20)), MAX(age), MAX(CAST(gender AS VARCHAR(10)))
+    FROM stg_master_hospital_data
+    WHERE mrd_no IS NOT NULL
+    GROUP BY mrd_no
+    ON CONFLICT (mrd_no) DO NOTHING""",
+    """INSERT INTO dim_department (department)
+    SELECT DISTINCT CAST(type_of_admissionemergencyopd AS VARCHAR(100))
+    FROM stg_master_hospital_data
+    WHERE type_of_admissionemergencyopd IS NOT NULL
+    ON CONFLICT (department) DO NOTHING""",
+]
+
+FACT_SQL = """INSERT INTO fact_admissions (
+    mrd_no, doa, dod, age, age_bucket, gender, department, diagnosis,
+    length_of_stay, admission_week, is_mortality_case,
+    pm25, pm10, no2, so2, pollution_category, load_batch_id
+)
+SELECT
+    CAST(mrd_no AS VARCHAR(20)),
+    doa,
+    dod,
+    age,
+    CAST(age_bucket AS VARCHAR(10)),
+    CAST(gender AS VARCHAR(10)),
+    CAST(type_of_admissionemergencyopd AS VARCHAR(100)),
+    outcome,
+    duration_of_stay,
+    {iso_week},
+    CASE WHEN {death} THEN TRUE ELSE FALSE END,
+    p.pm25, p.pm10, p.no2, p.so2,
+    COALESCE(p.pollution_category, 'Unknown'),
+    {batch_id}
+FROM stg_master_hospital_data
+LEFT JOIN dim_pollution p ON p.recorded_date = doa
+WHERE mrd_no IS NOT NULL AND doa IS NOT NULL"""
+
+POLLUTION_UPSERT_SQL = """INSERT INTO dim_pollution
+    (recorded_date, aqi, pm25, pm10, no2, so2, pollution_category)
+VALUES ({params})
+ON CONFLICT (recorded_date) DO UPDATE SET
+    aqi = excluded.aqi, pm25 = excluded.pm25, pm10 = excluded.pm10,
+    no2 = excluded.no2, so2 = excluded.so2, pollution_category = excluded.pollution_category"""
+
+# Facts loaded before their pollution day arrived pick it up here
+POLLUTION_BACKFILL_SQL = """UPDATE fact_admissions
+SET pm25 = p.pm25, pm10 = p.pm10, no2 = p.no2, so2 = p.so2,
+    pollution_category = p.pollution_category
+FROM dim_pollution p
+WHERE p.recorded_date = fact_admissions.doa
+  AND fact_admissions.doa BETWEEN {date} AND {date}"""
+
+# Exposure periods touched by a pollution load are recomputed from dim_pollution.
+# PostgreSQL only rounds NUMERIC to a scale, hence the casts of the FLOAT averages.
+EXPOSURE_UPSERT_SQL = """INSERT INTO {table}
+    ({key}, days, avg_aqi, avg_pm25, max_pm25, avg_pm10, avg_no2, avg_so2, pollution_category)
+SELECT {period},
+       COUNT(*),
+       ROUND(CAST(AVG(aqi) AS NUMERIC), 2),
+       ROUND(CAST(AVG(pm25) AS NUMERIC), 2),
+       MAX(pm25),
+       ROUND(CAST(AVG(pm10) AS NUMERIC), 2),
+       ROUND(CAST(AVG(no2) AS NUMERIC), 2),
+       ROUND(CAST(AVG(so2) AS NUMERIC), 2),
+       {band}
+FROM dim_pollution
+WHERE recorded_date >= {period_of_start} AND recorded_date <= {date}
+GROUP BY {period}
+ON CONFLICT ({key}) DO UPDATE SET
+    days = excluded.days, avg_aqi = excluded.avg_aqi, avg_pm25 = excluded.avg_pm25,
+    max_pm25 = excluded.max_pm25, avg_pm10 = excluded.avg_pm10, avg_no2 = excluded.avg_no2,
+    avg_so2 = excluded.avg_so2, pollution_category = excluded.pollution_category"""
+
+# Delta upserts: aggregate only the pending batches and add them onto the stored parts
+SUMMARY_UPSERT_SQL = [
+    """INSERT INTO monthly_admission_summary
+        (summary_month, total_admissions, avg_los, mortality_rate, los_sum, los_count, deaths)
+    SELECT {month},
+           COUNT(*),
+           ROUND(1.0 * SUM(length_of_stay) / NULLIF(COUNT(length_of_stay), 0), 2),
+           ROUND(100.0 * SUM(CASE WHEN is_mortality_case THEN 1 ELSE 0 END) / COUNT(*), 2),
+           SUM(length_of_stay),
+           COUNT(length_of_stay),
+           SUM(CASE WHEN is_mortality_case THEN 1 ELSE 0 END)
+    FROM fact_admissions
+    WHERE load_batch_id IN ({batch_ids})
+    GROUP BY {month}
+    ON CONFLICT (summary_month) DO UPDATE SET
+        total_admissions = monthly_admission_summary.total_admissions + excluded.total_admissions,
+        los_sum = COALESCE(monthly_admission_summary.los_sum, 0) + COALESCE(excluded.los_sum, 0),
+        los_count = monthly_admission_summary.los_count + excluded.los_count,
+        deaths = monthly_admission_summary.deaths + excluded.deaths,
+        avg_los = ROUND(1.0 * (COALESCE(monthly_admission_summary.los_sum, 0) + COALESCE(excluded.los_sum, 0))
+                        / NULLIF(monthly_admission_summary.los_count + excluded.los_count, 0), 2),
+        mortality_rate = ROUND(100.0 * (monthly_admission_summary.deaths + excluded.deaths)
+                               / (monthly_admission_summary.total_admissions + excluded.total_admissions), 2)""",
+    """INSERT INTO department_summary
+        (department, total_admissions, avg_los, deaths, mortality_rate, los_sum, los_count)
+    SELECT department,
+           COUNT(*),
+           ROUND(1.0 * SUM(length_of_stay) / NULLIF(COUNT(length_of_stay), 0), 2),
+           SUM(CASE WHEN is_mortality_case THEN 1 ELSE 0 END),
+           ROUND(100.0 * SUM(CASE WHEN is_mortality_case THEN 1 ELSE 0 END) / COUNT(*), 2),
+           SUM(length_of_stay),
+           COUNT(length_of_stay)
+    FROM fact_admissions
+    WHERE load_batch_id IN ({batch_ids}) AND department IS NOT NULL
+    GROUP BY department
+    ON CONFLICT (department) DO UPDATE SET
+        total_admissions = department_summary.total_admissions + excluded.total_admissions,
+        los_sum = COALESCE(department_summary.los_sum, 0) + COALESCE(excluded.los_sum, 0),
+        los_count = department_summary.los_count + excluded.los_count,
+        deaths = department_summary.deaths + excluded.deaths,
+        avg_los = ROUND(1.0 * (COALESCE(department_summary.los_sum, 0) + COALESCE(excluded.los_sum, 0))
+                        / NULLIF(department_summary.los_count + excluded.los_count, 0), 2),
+        mortality_rate = ROUND(100.0 * (department_summary.deaths + excluded.deaths)
+                               / (department_summary.total_admissions + excluded.total_admissions), 2)""",
+]
+
+
+def pollution_refresh_sql(backend, first, last):
+    """
+    (sql, params) statements that backfill facts and recompute the exposure
+    periods after a pollution load covering the ISO dates `first`..`last`.
+    The dates are bound parameters, never spliced into the SQL text.
+    """
+    dialect = DIALECTS[backend]
+    date = dialect['date_param']
+    statements = [(POLLUTION_BACKFILL_SQL.format(date=date), (first, last))]
+    for table, key, period in [('pollution_weekly_exposure', 'week_start', 'pollution_week'),
+                               ('pollution_monthly_exposure', 'month_start', 'pollution_month')]:
+        # Widen the range to the start of the first touched period
+        statements.append((EXPOSURE_UPSERT_SQL.format(
+            table=table, key=key, period=dialect[period].format(date='recorded_date'),
+            period_of_start=dialect[period].format(date=date), date=date,
+            band=pollution_band_sql("AVG(pm25)")), (first, last)))
+    return statements
+
+
+def parse_dates(values, near=None):
+    """Parse HDHI dates (see `schema.parse_hdhi_dates`) into ISO date strings."""
+    return parse_hdhi_dates(values, near=near).dt.strftime("%Y-%m-%d")
+
+
+class WarehouseLoader:
+    def __init__(self, dsn=":memory:", backend="sqlite", batch_size=50000):
+        if backend not in DIALECTS:
+            raise ValueError(f"Unsupported backend: {backend}")
+        self.backend = backend
+        self.dsn = dsn
+        self.batch_size = batch_size
+        self.sql = DIALECTS[backend]
+        self.conn = self._connect()
+        self.timings = {}
+
+    def _connect(self):
+        if self.backend == "sqlite":
+            conn = sqlite3.connect(self.dsn, check_same_thread=False)
+            # Bulk-load settings: the database can always be rebuilt from the CSV
+            conn.execute("PRAGMA synchronous = OFF")
+            # WAL lets dashboard readers keep querying while a load or refresh writes
+            conn.execute("PRAGMA journal_mode = WAL")
+            return conn
+        import psycopg2
+        return psycopg2.connect(self.dsn)
+
+    def execute(self, sql, params=None):
+        cur = self.conn.cursor()
+        cur.execute(sql, params or ())
+        return cur
+
+    def scalar(self, sql):
+        return self.execute(sql).fetchone()[0]
+
+    def _timed(self, name, start):
+        self.timings[name] = round(time.perf_counter() - start, 3)
+        print(f"{name}: {self.timings[name]}s")
+
+    def create_schema(self):
+        staging_columns = ", ".join(f"{name} {sql_type}" for name, sql_type in STAGING_COLUMNS)
+        for statement in SCHEMA_SQL:
+            self.execute(statement.format(staging_columns=staging_columns, **self.sql))
+        if self.backend == "sqlite":
+            for statement in SQLITE_TRIGGER_SQL:
+                self.execute(statement)
+        self.conn.commit()
+
+    def _prepare_batch(self, chunk):
+        batch = chunk.reindex(columns=STAGING_NAMES)
+        if self.backend == "postgres":
+            # COPY is strict about INT text; SQLite's integer affinity converts on insert
+            for col in INT_COLUMNS:
+                batch[col] = pd.to_numeric(batch[col], errors="coerce").round().astype("Int64")
+        # doa / dod written either way round resolve against month_year and the length of stay
+        admit, discharge = parse_admission_dates(batch)
+        batch['doa'], batch['dod'] = admit.dt.strftime("%Y-%m-%d"), discharge.dt.strftime("%Y-%m-%d")
+        return batch
+
+    def _copy_batch(self, batch):
+        if self.backend == "postgres":
+            buf = io.StringIO()
+            batch.to_csv(buf, index=False, header=False)
+            buf.seek(0)
+            self.conn.cursor().copy_expert(
+                f"COPY stg_master_hospital_data ({', '.join(STAGING_NAMES)}) FROM STDIN WITH (FORMAT csv)", buf)
+        else:
+            rows = batch.astype(object).where(batch.notna(), None).itertuples(index=False, name=None)
+            placeholders = ", ".join("?" * len(STAGING_NAMES))
+            self.conn.executemany(f"INSERT INTO stg_master_hospital_data VALUES ({placeholders})", rows)
+
+    def load_staging(self, source):
+        """Replace the staging table with `source` (CSV path or DataFrame), batch by batch."""
+        start = time.perf_counter()
+        self.execute("DELETE FROM stg_master_hospital_data")
+        chunks = ([source[i:i + self.batch_size] for i in range(0, len(source), self.batch_size)]
+                  if isinstance(source, pd.DataFrame)
+                  else pd.read_csv(source, dtype=str, chunksize=self.batch_size))
+        rows = 0
+        for chunk in chunks:
+            batch = self._prepare_batch(chunk)
+            self._copy_batch(batch)
+            rows += len(batch)
+        self.conn.commit()
+        self._timed("load_staging", start)
+        return rows
+
+    def populate_dimensions(self):
+        start = time.perf_counter()
+        for statement in DIMENSION_SQL:
+            self.execute(statement)
+        self.conn.commit()
+        self._timed("populate_dimensions", start)
+
+    def load_pollution(self, source):
+        """
+        Upsert daily pollution readings into dim_pollution with PM2.5 banding.
+
+        Facts on the affected dates are backfilled and only the weekly and
+        monthly exposure periods covering those dates are recomputed.
+        """
+        start = time.perf_counter()
+        raw = source if isinstance(source, pd.DataFrame) else pd.read_csv(source, encoding="utf-8-sig")
+        raw.columns = raw.columns.str.strip()
+        pollution = raw[list(POLLUTION_COLUMNS)].rename(columns=POLLUTION_COLUMNS)
+        pollution['recorded_date'] = parse_dates(pollution['recorded_date'].astype(str))
+        for col in ['aqi', 'pm25', 'pm10', 'no2', 'so2']:
+            pollution[col] = pd.to_numeric(pollution[col], errors="coerce")
+        pollution = pollution.dropna(subset=['recorded_date']).drop_duplicates('recorded_date', keep='last')
+        pollution['pollution_category'] = pollution_band(pollution['pm25'])
+
+        rows = pollution.astype(object).where(pollution.notna(), None).itertuples(index=False, name=None)
+        params = ", ".join([self.sql['param']] * len(pollution.columns))
+        self.conn.cursor().executemany(POLLUTION_UPSERT_SQL.format(params=params), list(rows))
+
+        first, last = pollution['recorded_date'].min(), pollution['recorded_date'].max()
+        for statement, params in pollution_refresh_sql(self.backend, first, last):
+            self.execute(statement, params)
+        load_id = self.scalar("SELECT COALESCE(MAX(load_id), 0) + 1 FROM pollution_loads")
+        date = self.sql['date_param']
+        self.execute(f"INSERT INTO pollution_loads (load_id, row_count, first_date, last_date) "
+                     f"VALUES ({load_id}, {len(pollution)}, {date}, {date})", (first, last))
+        self.conn.commit()
+        self._timed("load_pollution", start)
+        return len(pollution)
+
+    def _fact_triggers(self):
+        if self.backend == "sqlite":
+            return self.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'fact_admissions'"
+            ).fetchall()
+        return []
+
+    def populate_facts(self, defer_triggers=True):
+        """
+        Insert staged admissions into fact_admissions in one statement.
+
+        With `defer_triggers`, per-row triggers are switched off for the insert
+        and the LOS outlier check runs once, set-based, over the new rows.
+        """
+        start = time.perf_counter()
+        first_new_id = self.scalar("SELECT COALESCE(MAX(admission_id), 0) FROM fact_admissions")
+        batch_id = self.scalar("SELECT COALESCE(MAX(batch_id), 0) + 1 FROM load_batches")
+
+        triggers = []
+        if defer_triggers:
+            if self.backend == "postgres":
+                self.execute("ALTER TABLE fact_admissions DISABLE TRIGGER USER")
+            else:
+                triggers = self._fact_triggers()
+                for name, _ in triggers:
+                    self.execute(f"DROP TRIGGER {name}")
+
+        cur = self.execute(FACT_SQL.format(death=DEATH_OUTCOMES_SQL, batch_id=batch_id, **self.sql))
+        inserted = cur.rowcount
+        self.execute(f"INSERT INTO load_batches (batch_id, row_count, summaries_refreshed) "
+                     f"VALUES ({batch_id}, {inserted}, FALSE)")
+
+        if defer_triggers:
+            if self.backend == "postgres":
+                self.execute("ALTER TABLE fact_admissions ENABLE TRIGGER USER")
+            for _, sql in triggers:
+                self.execute(sql)
+            outliers = self.flag_los_outliers(first_new_id)
+            print(f"Outlier check: {outliers} admissions with LOS > {LOS_OUTLIER_DAYS} days")
+
+        self.conn.commit()
+        self._timed("populate_facts", start)
+        return inserted
+
+    def flag_los_outliers(self, after_admission_id=0):
+        """Set-based replacement for tg_flag_los_outlier over admissions after `after_admission_id`."""
+        where = f"admission_id > {int(after_admission_id)} AND length_of_stay > {LOS_OUTLIER_DAYS}"
+        if self.backend == "sqlite":
+            self.execute(f"INSERT INTO los_outlier_log (mrd_no, length_of_stay) "
+                         f"SELECT mrd_no, length_of_stay FROM fact_admissions WHERE {where}")
+        return self.scalar(f"SELECT COUNT(*) FROM fact_admissions WHERE {where}")
+
+    def refresh_summaries(self):
+        """
+        Fold every pending load batch into the summary tables.
+
+        Only the months and departments present in those batches are touched,
+        and the upserts plus the change-log update commit together, so a batch
+        is applied exactly once even if a refresh is interrupted.
+        """
+        start = time.perf_counter()
+        pending = [row[0] for row in self.execute(
+            "SELECT batch_id FROM load_batches WHERE NOT summaries_refreshed ORDER BY batch_id").fetchall()]
+        if pending:
+            batch_ids = ", ".join(str(int(b)) for b in pending)
+            for statement in SUMMARY_UPSERT_SQL:
+                self.execute(statement.format(batch_ids=batch_ids, **self.sql))
+            self.execute(f"UPDATE load_batches SET summaries_refreshed = TRUE WHERE batch_id IN ({batch_ids})")
+        self.conn.commit()
+        self._timed("refresh_summaries", start)
+        return pending
+
+    def run_all(self, source, pollution_source=None, defer_triggers=True):
+        print("Step 1: Creating schema...")
+        self.create_schema()
+        print("Step 2: Bulk loading staging...")
+        staged = self.load_staging(source)
+        print("Step 3: Populating dimensions...")
+        self.populate_dimensions()
+        if pollution_source is not None:
+            self.load_pollution(pollution_source)
+        print("Step 4: Populating fact table...")
+        facts = self.populate_facts(defer_triggers=defer_triggers)
+        print("Step 5: Refreshing summaries...")
+        self.refresh_summaries()
+        print(f"Loaded {staged} staged rows, {facts} fact rows.")
+        return facts
+
+
+if __name__ == "__main__":
+    from carepulse.paths import MASTER_DATA, POLLUTION_DATA
+
+    loader = WarehouseLoader("carepulse_hdhi.db")
+    loader.run_all(MASTER_DATA, pollution_source=POLLUTION_DATA)
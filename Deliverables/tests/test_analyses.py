@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+
+from carepulse.paths import MASTER_DATA, POLLUTION_DATA
+from carepulse.warehouse import WarehouseLoader
+
+pytest.importorskip("duckdb")
+from carepulse.analyses import AnalysisRunner
+
+POLLUTION_SQL = "SELECT pollution_category, COUNT(*) AS admissions FROM fact_admissions GROUP BY 1 ORDER BY 1"
+
+
+def test_revised_pollution_load_misses_the_cache(tmp_path):
+    loader = WarehouseLoader()
+    loader.run_all(pd.read_csv(MASTER_DATA, dtype=str, nrows=2000), pollution_source=POLLUTION_DATA)
+    runner = AnalysisRunner.embedded(loader, cache_dir=str(tmp_path), explain=False)
+    before, stats = runner.run_query(POLLUTION_SQL)
+    assert not stats['cached']
+    assert runner.run_query(POLLUTION_SQL)[1]['cached']
+    runner.close()
+
+    # Same dates, revised readings: no fact or pollution row count changes
+    revised = pd.read_csv(POLLUTION_DATA, encoding="utf-8-sig")
+    revised['PM2.5 AVG'] = pd.to_numeric(revised['PM2.5 AVG'], errors='coerce') + 100
+    loader.load_pollution(revised)
+    runner = AnalysisRunner.embedded(loader, cache_dir=str(tmp_path), explain=False)
+    after, stats = runner.run_query(POLLUTION_SQL)
+    runner.close()
+    assert not stats['cached']
+    assert not before.equals(after)
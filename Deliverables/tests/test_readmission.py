@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from carepulse.paths import ADMISSION_DATA
+from carepulse.readmission import READMISSION_WINDOWS, readmission_features
+from carepulse.schema import parse_admission_dates
+from carepulse.validation import clean_column_names
+
+
+def reference_features(df, windows=READMISSION_WINDOWS):
+    """The same columns the slow way: sort, groupby/cumcount and shift per patient."""
+    admit, discharge = parse_admission_dates(df)
+    frame = pd.DataFrame({'mrd_no': df['mrd_no'].astype(str), 'doa': admit, 'dod': discharge}, index=df.index)
+    frame = frame[df['mrd_no'].notna() & admit.notna()].sort_values(['mrd_no', 'doa'], kind='stable')
+    by_patient = frame.groupby('mrd_no', sort=False)
+    expected = pd.DataFrame(index=df.index)
+    expected['admission_seq'] = (by_patient.cumcount() + 1).reindex(df.index, fill_value=0)
+    gap = (frame['doa'] - by_patient['dod'].shift()).dt.days
+    expected['days_since_last_discharge'] = gap.reindex(df.index)
+    for days in windows:
+        expected[f"readmit_{days}d"] = (gap <= days).astype(int).reindex(df.index, fill_value=0)
+    return expected
+
+
+@pytest.fixture(scope="module")
+def admissions():
+    df = pd.read_csv(ADMISSION_DATA)
+    df.columns = clean_column_names(df.columns)
+    return df
+
+
+def test_matches_groupby_reference_on_extract(admissions):
+    features = readmission_features(admissions)
+    expected = reference_features(admissions)
+    for col in expected.columns:
+        np.testing.assert_array_equal(features[col].to_numpy(dtype=float), expected[col].to_numpy(dtype=float),
+                                      err_msg=col)
+
+
+def test_ambiguous_dates_follow_month_year():
+    # "11/10/2017" is 11 Oct here (month_year Oct-17), so the second stay is a 7-day readmission
+    df = pd.DataFrame({'mrd_no': [1, 1], 'doa': ['10/4/2017', '11/10/2017'], 'dod': ['10/4/2017', '10/12/2017'],
+                       'month_year': ['Oct-17', 'Oct-17'], 'duration_of_stay': [1, 2]})
+    features = readmission_features(df)
+    assert features['admission_seq'].tolist() == [1, 2]
+    assert features['days_since_last_discharge'].tolist()[1] == 7
+    assert features['readmit_7d'].tolist() == [0, 1]
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from carepulse import paths
+
+pytest.importorskip("sklearn")
+step = paths.load_step("Step 8 - Patient Recommendation System.py")
+
+
+def cohort(n, start=1, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'mrd_no': np.arange(start, start + n),
+        'age': rng.integers(20, 90, n),
+        'gender': rng.choice(['M', 'F'], n),
+        'los': rng.integers(1, 20, n),
+        'pollution_pm25': rng.uniform(20, 200, n),
+        'pollution_no2': rng.uniform(5, 60, n),
+        'pollution_o3': rng.uniform(10, 80, n),
+        'mortality_flag': rng.integers(0, 2, n),
+    })
+
+
+def test_insert_during_merge_stays_aligned_after_reload(tmp_path):
+    recommender = step.PatientRecommender(index_dir=str(tmp_path))
+    recommender.raw_data = cohort(200)
+    recommender.preprocess()
+    recommender.compute_similarity()
+    recommender.save_index()
+    recommender.add_patients(cohort(3, start=900001, seed=1))
+
+    # Another insert lands after _merge_delta snapshotted the delta, before the tree is rebuilt
+    compact = recommender.index.compact
+
+    def compact_with_concurrent_insert(n=None):
+        recommender.add_patients(cohort(2, start=900101, seed=2))
+        return compact(n)
+
+    recommender.index.compact = compact_with_concurrent_insert
+    recommender.save_index()
+    assert len(recommender.profile_ids) == 203
+    assert len(recommender.delta_profiles) == len(recommender.index.delta) == 2
+
+    reloaded = step.PatientRecommender.from_index(str(tmp_path))
+    assert len(reloaded.index) == len(reloaded.profile_ids) + len(reloaded.delta_profiles) == 205
+    for mrd_no in (900001, 900101):
+        similar = reloaded.recommend_similar_patients(mrd_no, top_n=3, exact=True)
+        assert len(similar) == 3 and mrd_no not in similar['mrd_no'].astype(int).tolist()
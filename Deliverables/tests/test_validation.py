@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from carepulse.paths import ADMISSION_DATA
+from carepulse.schema import parse_admission_dates
+from carepulse.validation import ValidationEngine, clean_column_names
+
+
+@pytest.fixture(scope="module")
+def admissions():
+    df = pd.read_csv(ADMISSION_DATA)
+    df.columns = clean_column_names(df.columns)
+    return df
+
+
+def test_admission_dates_agree_with_month_year(admissions):
+    admit, discharge = parse_admission_dates(admissions)
+    month_year = pd.to_datetime(admissions['month_year'], format="%b-%y")
+    assert (admit.dt.to_period('M').dt.to_timestamp() == month_year).all()
+
+
+def test_quarantines_only_impossible_stays(admissions):
+    engine = ValidationEngine()
+    clean, quarantined = engine.validate(admissions)
+    assert len(clean) + len(quarantined) == len(admissions)
+    # Six discharges before admission and one unreadable discharge date ("2-1217")
+    assert quarantined['failed_rules'].value_counts().to_dict() == {'dod_not_before_doa': 6, 'dod_date': 1}
+
+
+def test_month_year_mismatch_is_quarantined(admissions):
+    shifted = admissions.head(50).copy()
+    shifted.loc[0, 'month_year'] = 'May-17'
+    _, quarantined = ValidationEngine().validate(shifted)
+    assert quarantined['failed_rules'].tolist() == ['doa_matches_month_year']
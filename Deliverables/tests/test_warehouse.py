@@ -0,0 +1,30 @@
+import re
+
+import pandas as pd
+
+from carepulse.paths import POLLUTION_DATA
+from carepulse.warehouse import WarehouseLoader, pollution_refresh_sql
+
+
+def test_postgres_pollution_refresh_binds_dates_and_rounds_numeric():
+    statements = pollution_refresh_sql('postgres', '2017-04-01', '2017-04-30')
+    assert len(statements) == 3
+    for sql, params in statements:
+        assert sql.count('%s') == len(params) == 2
+        assert '2017-' not in sql
+        assert not re.search(r"ROUND\(AVG", sql)
+    weekly = statements[1][0]
+    assert "recorded_date >= CAST(DATE_TRUNC('week', CAST(%s AS DATE)) AS DATE)" in weekly
+    assert "ROUND(CAST(AVG(aqi) AS NUMERIC), 2)" in weekly
+
+
+def test_sqlite_exposure_periods_cover_every_loaded_day():
+    loader = WarehouseLoader()
+    loader.create_schema()
+    days = loader.load_pollution(POLLUTION_DATA)
+
+    weekly = pd.read_sql("SELECT * FROM pollution_weekly_exposure", loader.conn)
+    monthly = pd.read_sql("SELECT * FROM pollution_monthly_exposure", loader.conn)
+    assert weekly['days'].sum() == monthly['days'].sum() == days
+    assert (pd.to_datetime(weekly['week_start']).dt.dayofweek == 0).all()
+    assert (pd.to_datetime(monthly['month_start']).dt.day == 1).all()